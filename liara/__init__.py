@@ -1,4 +1,5 @@
 import datetime
+import functools
 import logging
 import os
 import pathlib
@@ -14,6 +15,7 @@ from typing import (
         Optional,
         Text,
         Union,
+        get_args,
     )
 
 import collections
@@ -25,9 +27,11 @@ from .site import Site, ContentFilterFactory
 from .nodes import (
     DocumentNodeFactory,
     RedirectionNode,
+    ResourceNode,
     ResourceNodeFactory,
 
-    _process_node_sync
+    _process_node_sync,
+    _THUMBNAIL_CACHE_KEY
 )
 
 from .cache import Cache, FilesystemCache, NullCache, Sqlite3Cache, RedisCache
@@ -73,6 +77,98 @@ class _LoadedModule:
     hash: bytes
 
 
+class _BuildManifest:
+    """Tracks the source files that were used to produce the output of the
+    previous build, which enables incremental builds.
+
+    The manifest stores the modification time of the source (and metadata)
+    file of each document and resource node, together with the path of the
+    generated output. A node is up-to-date if its source files didn't change
+    and the output still exists. The whole manifest is discarded if the
+    ``key`` doesn't match, which covers everything else that affects the
+    output: configuration, metadata, templates, plugins, and the set of nodes
+    in the site."""
+    __log = logging.getLogger(f'{__name__}.{__qualname__}')
+
+    def __init__(self, path: pathlib.Path, key: str, *, load=True):
+        self.__path = path
+        self.__key = key
+        self.__previous_entries: Dict[str, Dict] = {}
+        self.__entries: Dict[str, Dict] = {}
+
+        if load:
+            self.__load()
+
+    def __load(self):
+        import json
+        try:
+            manifest = json.loads(self.__path.read_bytes())
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            self.__log.warning('Could not read build manifest "%s", '
+                               'rebuilding all nodes', self.__path,
+                               exc_info=e)
+            return
+
+        if manifest.get('version') != 1 or manifest.get('key') != self.__key:
+            self.__log.info('Site changed since the last build, rebuilding '
+                            'all nodes')
+            return
+
+        self.__previous_entries = manifest['entries']
+
+    @staticmethod
+    def __get_source_timestamps(node) -> List[int]:
+        timestamps = [node.src.stat().st_mtime_ns]
+        if node.metadata_path:
+            timestamps.append(node.metadata_path.stat().st_mtime_ns)
+        return timestamps
+
+    def is_up_to_date(self, node) -> bool:
+        """Check if the output of ``node`` from the previous build can be
+        reused. Up-to-date nodes are carried over into the new manifest."""
+        key = str(node.path)
+        entry = self.__previous_entries.get(key)
+        if entry is None:
+            return False
+
+        if entry['source'] != self.__get_source_timestamps(node):
+            return False
+
+        if not os.path.exists(entry['output']):
+            return False
+
+        self.__entries[key] = entry
+        return True
+
+    def add(self, node, output_path: Optional[pathlib.Path]) -> None:
+        """Record that ``node`` was published to ``output_path``."""
+        # Publishing can fail, for instance, if a resource has no content
+        if output_path is None:
+            return
+
+        self.__entries[str(node.path)] = {
+            'source': self.__get_source_timestamps(node),
+            'output': str(output_path)
+        }
+
+    def persist(self) -> None:
+        """Write the manifest to disk.
+
+        We write to a temporary file first, so an interrupted build can never
+        leave a truncated manifest behind."""
+        import json
+        self.__path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = self.__path.with_name(self.__path.name + '.tmp')
+        temporary_path.write_text(json.dumps({
+            'version': 1,
+            'key': self.__key,
+            'entries': self.__entries
+        }), encoding='utf-8')
+        os.replace(temporary_path, self.__path)
+
+
 def _create_relative_path(path: pathlib.Path, root: pathlib.Path) \
         -> pathlib.PurePosixPath:
     """"Make a root-relative path.
@@ -87,6 +183,26 @@ def _create_relative_path(path: pathlib.Path, root: pathlib.Path) \
     return __ROOT_PATH / pathlib.PurePosixPath(path.with_name(path.stem))
 
 
+_CONFIGURATION_IGNORE_KEYS = {
+    'content.markdown.extensions',
+    'content.markdown.config',
+    'content.markdown.output'
+}
+
+
+@functools.cache
+def _get_flattened_default_configuration() -> Dict:
+    """Get the flattened default configuration.
+
+    The default configuration never changes, so we only create and flatten it
+    once per process. The result is shared, so it must not be modified. This
+    is not a problem for the configuration ``ChainMap``, which only ever
+    writes into its first mapping. We don't use a ``MappingProxyType``
+    here, as the configuration gets pickled to compute the cache key."""
+    return flatten_dictionary(config.create_default_configuration(),
+                              ignore_keys=_CONFIGURATION_IGNORE_KEYS)
+
+
 def _process_resource_task(t):
     return t.process()
 
@@ -115,6 +231,11 @@ class Liara:
     __registered_plugins: Dict[object, _LoadedModule] = dict()
     __filesystem_walker: FilesystemWalker
     __template_repository: TemplateRepository
+    __template_path: pathlib.Path
+    __template_paths: Dict[str, str]
+    __template_configuration_path: pathlib.Path
+    __template_node_directories: List[pathlib.Path]
+    __thumbnail_cache_key: _THUMBNAIL_CACHE_KEY
 
     def __init__(self,
                  configuration: Optional[
@@ -127,7 +248,6 @@ class Liara:
         if configuration_overrides is None:
             configuration_overrides = {}
 
-        default_configuration = config.create_default_configuration()
         if configuration is None:
             project_configuration = {}
         elif isinstance(configuration, str):
@@ -144,17 +264,12 @@ class Liara:
         if project_configuration is None:
             project_configuration = dict()
 
-        ignore_list = {
-            'content.markdown.extensions',
-            'content.markdown.config',
-            'content.markdown.output'
-        }
-
         self.__configuration = collections.ChainMap(
             # Must be flattened already
             configuration_overrides,
-            flatten_dictionary(project_configuration, ignore_keys=ignore_list),
-            flatten_dictionary(default_configuration, ignore_keys=ignore_list))
+            flatten_dictionary(project_configuration,
+                               ignore_keys=_CONFIGURATION_IGNORE_KEYS),
+            _get_flattened_default_configuration())
 
         Liara.setup_plugins()
 
@@ -168,6 +283,17 @@ class Liara:
         self.__resource_node_factory = ResourceNodeFactory(
             self.__configuration
         )
+
+        # We check this here, as a typo would otherwise silently fall back to
+        # hashing the content of each image
+        thumbnail_cache_key = self.__configuration[
+            'build.resource.thumbnail.cache_key']
+        if thumbnail_cache_key not in get_args(_THUMBNAIL_CACHE_KEY):
+            raise Exception(
+                'Unknown thumbnail cache key: '
+                f'"{thumbnail_cache_key}", must be one of '
+                + ', '.join(f'"{k}"' for k in get_args(_THUMBNAIL_CACHE_KEY)))
+        self.__thumbnail_cache_key = thumbnail_cache_key
         self.__document_node_factory = DocumentNodeFactory(
             self.__configuration
         )
@@ -273,6 +399,9 @@ class Liara:
         from .template import Jinja2TemplateRepository, MakoTemplateRepository
 
         template_path = configuration_file.parent
+        self.__template_path = template_path
+        self.__template_configuration_path = configuration_file
+        self.__template_node_directories = []
         default_configuration = config.create_default_template_configuration()
         configuration = load_yaml(configuration_file.open('rb'))
 
@@ -293,6 +422,7 @@ class Liara:
 
         backend = configuration['backend']
         paths = configuration['paths']
+        self.__template_paths = paths
 
         # Legacy option
         if 'image_thumbnail_sizes' in configuration:
@@ -329,12 +459,16 @@ class Liara:
             self.__discover_resources(self.__site,
                                       self.__resource_node_factory,
                                       template_path / resource_directory)
+            self.__template_node_directories.append(
+                template_path / resource_directory)
 
         if 'static_directory' in configuration:
             static_directory = pathlib.Path(
                 configuration['static_directory'])
             self.__discover_static(self.__site,
                                    template_path / static_directory)
+            self.__template_node_directories.append(
+                template_path / static_directory)
 
     def __discover_redirections(self, site: Site, static_routes: pathlib.Path):
         if not static_routes.exists():
@@ -513,11 +647,11 @@ class Liara:
                 site.add_resource(node)
 
     def __discover_feeds(self, site: Site, feed_definition: pathlib.Path) -> None:
-        from .feeds import JsonFeedNode, RSSFeedNode, SitemapXmlFeedNode
-
         if not feed_definition.exists():
             return
 
+        from .feeds import JsonFeedNode, RSSFeedNode, SitemapXmlFeedNode
+
         for key, options in load_yaml(feed_definition.open('rb')).items():
             path = pathlib.PurePosixPath(options['path'])
             del options['path']
@@ -571,7 +705,9 @@ class Liara:
         self.__discover_feeds(self.__site, feeds)
 
         if self.__thumbnail_definition:
-            self.__site.create_thumbnails(self.__thumbnail_definition)
+            self.__site.create_thumbnails(
+                self.__thumbnail_definition,
+                cache_key=self.__thumbnail_cache_key)
 
         self.__site.create_links()
 
@@ -607,7 +743,7 @@ class Liara:
             shutil.rmtree(output_directory)
         self.__log.info('Output directory cleaned')
 
-    def __build_resources(self, site: Site, cache: Cache,
+    def __build_resources(self, resources: List[ResourceNode], cache: Cache,
                           parallel_build=True):
         self.__log.info('Processing resources ...')
 
@@ -615,19 +751,27 @@ class Liara:
             async_resource_tasks = []
             async_resource_results = []
 
-            for resource in site.resources:
+            for resource in resources:
                 if async_task := resource.process(cache):
                     async_resource_tasks.append((resource, async_task,))
 
             self.__log.debug('%d async resource tasks pending ...',
                              len(async_resource_tasks))
 
-            with multiprocessing.Pool(
-                    initializer=_setup_multiprocessing_worker,
-                    initargs=(logging.root.level,)) as pool:
-                async_resource_results = pool.map(
-                    _process_resource_task,
-                    [r[1] for r in async_resource_tasks])
+            # Starting the worker processes is expensive, and with a warm
+            # cache there's often nothing left to do for them. A single task
+            # gets processed directly, as the pool can't speed it up
+            if len(async_resource_tasks) > 1:
+                with multiprocessing.Pool(
+                        initializer=_setup_multiprocessing_worker,
+                        initargs=(logging.root.level,)) as pool:
+                    async_resource_results = pool.map(
+                        _process_resource_task,
+                        [r[1] for r in async_resource_tasks])
+            else:
+                async_resource_results = [
+                    _process_resource_task(r[1]) for r in async_resource_tasks
+                ]
 
             self.__log.debug('Processed %d async resource tasks',
                              len(async_resource_tasks))
@@ -637,14 +781,14 @@ class Liara:
                 resource.content = result
                 task.update_cache(result, cache)
         else:
-            for resource in site.resources:
+            for resource in resources:
                 _process_node_sync(resource, cache)
 
-        self.__log.info(f'Processed {len(site.resources)} resources')
+        self.__log.info(f'Processed {len(resources)} resources')
 
-    def __set_cache_prefix(self):
-        """Set the cache prefix based on anything that could impact the
-        site generation that is not the content of the file that is processed.
+    def __get_site_digest(self) -> bytes:
+        """Get a digest of anything that could impact the site generation that
+        is not the content of the file that is processed.
 
         We currently use the configuration, site metadata (as this is affected
         for example by the 'base_url' when locally serving), data nodes,
@@ -658,21 +802,141 @@ class Liara:
             key: value.hash for key, value in self.__registered_plugins.items()
         }
 
-        self.__cache.set_key_prefix(
-            hashlib.shake_128(
-                get_hash_key_for_map(self.__configuration)
-                + get_hash_key_for_map(self.__site.metadata)
-                + get_hash_key_for_map(site_data)
-                + get_hash_key_for_map(plugin_hashes)
-                + __version__.encode('utf-8')).digest(16)
-        )
+        return hashlib.shake_128(
+            get_hash_key_for_map(self.__configuration)
+            + get_hash_key_for_map(self.__site.metadata)
+            + get_hash_key_for_map(site_data)
+            + get_hash_key_for_map(plugin_hashes)
+            + __version__.encode('utf-8')).digest(16)
+
+    def __set_cache_prefix(self, site_digest: Optional[bytes] = None):
+        """Set the cache prefix based on :py:meth:`__get_site_digest`.
+
+        :param site_digest: The site digest, if it has been computed already.
+        """
+        if site_digest is None:
+            site_digest = self.__get_site_digest()
+        self.__cache.set_key_prefix(site_digest)
+
+    def __get_template_files(self) -> List[pathlib.Path]:
+        """Get all template files which can affect the output, sorted by path.
+
+        Templates can extend, include or import any other file, so this
+        returns the configured templates and all files in the template
+        directory. Skipped are:
+
+        * Resources and static files, which are nodes and get tracked
+          individually.
+        * The content, output and cache directories as well as the build
+          manifest, as they may be inside the template directory if the
+          template configuration is placed next to the site configuration.
+        * Hidden directories (for instance, ``.git``) and files matching
+          ``ignore_files``."""
+        import fnmatch
+
+        template_files = {
+            self.__template_path / template
+            for template in self.__template_paths.values()
+        }
+
+        excluded_directories = {
+            pathlib.Path(self.__configuration[key]).resolve()
+            for key in ['content_directory',
+                        'resource_directory',
+                        'static_directory',
+                        'output_directory',
+                        'build.cache.fs.directory',
+                        'build.cache.db.directory']
+        }
+        excluded_directories.update(
+            d.resolve() for d in self.__template_node_directories)
+        manifest_path = pathlib.Path(
+            self.__configuration['build.manifest']).resolve()
+        ignore_files = self.__configuration['ignore_files']
+
+        result = {template for template in template_files
+                  if template.exists()}
+        for dirpath, dirnames, filenames in os.walk(self.__template_path):
+            # Sorting in-place also makes os.walk visit the directories in a
+            # stable order
+            dirnames[:] = sorted(
+                d for d in dirnames
+                if not d.startswith('.')
+                and pathlib.Path(dirpath, d).resolve()
+                not in excluded_directories)
+
+            for filename in filenames:
+                if any(fnmatch.fnmatch(filename, pattern)
+                       for pattern in ignore_files):
+                    continue
+
+                path = pathlib.Path(dirpath, filename)
+                if path.resolve() != manifest_path:
+                    result.add(path)
+
+        return sorted(result)
+
+    def __create_build_manifest(self, site: Site, site_digest: bytes,
+                                force_rebuild: bool) -> _BuildManifest:
+        """Create the manifest used for incremental builds.
+
+        On top of the site digest, the manifest key covers the template
+        configuration, the modification times of all template files and the
+        paths of all nodes, as adding or removing a node can change the output
+        of every other node (for instance, through navigation or indices)."""
+        import hashlib
+        hasher = hashlib.sha256(site_digest)
+
+        # The template configuration maps URLs to templates, so we hash its
+        # contents instead of relying on the modification time
+        hasher.update(self.__template_configuration_path.read_bytes())
+
+        for path in self.__get_template_files():
+            hasher.update(str(path).encode('utf-8'))
+            hasher.update(str(path.stat().st_mtime_ns).encode('utf-8'))
+
+        hasher.update('\n'.join(sorted(map(str, site.urls))).encode('utf-8'))
+
+        return _BuildManifest(
+            pathlib.Path(self.__configuration['build.manifest']),
+            hasher.hexdigest(),
+            load=not force_rebuild)
+
+    def _process_documents(self, cache: Cache, *,
+                           site_digest: Optional[bytes] = None) -> None:
+        """Process all documents of the site.
+
+        This sets the cache key prefix first, so ``cache`` can be the
+        persistent cache as returned by :py:meth:`_get_cache`.
+
+        :param site_digest: The site digest, if it has been computed already.
+        """
+        self.__set_cache_prefix(site_digest)
+
+        site = self.__site
+        self.__log.info('Processing documents ...')
+        self.__log.debug(f'Using {cache.__class__.__name__} for caching')
+        for document in site.documents:
+            try:
+                args = {
+                    '$data' : site.merged_data
+                }
+                _process_node_sync(document, cache, **args)
+            except Exception as e:
+                self.__log.warning('Failed to process document "%s". Document '
+                                   'content will be empty.',
+                                   document.src,
+                                   exc_info=e)
+        self.__log.info(f'Processed {len(site.documents)} documents')
 
     def build(self, discover_content=True, *, disable_cache=False,
-              parallel_build=True):
+              parallel_build=True, force_rebuild=False):
         """Build the site.
 
         :param bool discover_content: If `True`, :py:meth:`discover_content`
                                       will be called first.
+        :param bool force_rebuild: If `True`, all nodes are published even if
+                                   incremental builds are enabled.
         """
         from .publish import TemplatePublisher
         self.__log.info('Build started')
@@ -688,26 +952,30 @@ class Liara:
         for document in site.documents:
             document.validate_metadata()
 
-        self.__set_cache_prefix()
+        site_digest = self.__get_site_digest()
+
+        # Incremental builds only make sense if the previous output is kept
+        manifest = None
+        if self.__configuration['build.incremental'] \
+                and not self.__configuration['build.clean_output']:
+            manifest = self.__create_build_manifest(site, site_digest,
+                                                    force_rebuild)
 
-        self.__log.info('Processing documents ...')
         cache = self.__cache if not disable_cache else NullCache()
-        self.__log.debug(f'Using {cache.__class__.__name__} for caching')
-        for document in site.documents:
-            try:
-                args = {
-                    '$data' : site.merged_data
-                }
-                _process_node_sync(document, cache, **args)
-            except Exception as e:
-                self.__log.warning('Failed to process document "%s". Document '
-                                   'content will be empty.',
-                                   document.src,
-                                   exc_info=e)
-        self.__log.info(f'Processed {len(site.documents)} documents')
+        self._process_documents(cache, site_digest=site_digest)
         signals.documents_processed.send(self, site=self.__site)
 
-        self.__build_resources(site, cache, parallel_build)
+        # Documents always get processed, as other nodes -- feeds for instance
+        # -- may need their content, but we can skip resources entirely
+        if manifest:
+            resources = [resource for resource in site.resources
+                         if not manifest.is_up_to_date(resource)]
+            self.__log.info('Skipping %d up-to-date resource(s)',
+                            len(site.resources) - len(resources))
+        else:
+            resources = site.resources
+
+        self.__build_resources(resources, cache, parallel_build)
 
         output_path = pathlib.Path(self.__configuration['output_directory'])
 
@@ -715,18 +983,31 @@ class Liara:
                                       self.__template_repository)
 
         self.__log.info('Publishing ...')
-        for document in site.documents:
-            document.publish(publisher)
-        self.__log.info(f'Published {len(site.documents)} document(s)')
+        if manifest:
+            published_documents = 0
+            for document in site.documents:
+                if manifest.is_up_to_date(document):
+                    continue
+                manifest.add(document, document.publish(publisher))
+                published_documents += 1
+            self.__log.info('Skipped %d up-to-date document(s)',
+                            len(site.documents) - published_documents)
+        else:
+            for document in site.documents:
+                document.publish(publisher)
+            published_documents = len(site.documents)
+        self.__log.info(f'Published {published_documents} document(s)')
 
         for index in site.indices:
             index.publish(publisher)
         self.__log.info(f'Published {len(site.indices)} '
                         f'{"indices" if len(site.indices) > 1 else "index"}')
 
-        for resource in site.resources:
-            resource.publish(publisher)
-        self.__log.info(f'Published {len(site.resources)} resource(s)')
+        for resource in resources:
+            output = resource.publish(publisher)
+            if manifest:
+                manifest.add(resource, output)
+        self.__log.info(f'Published {len(resources)} resource(s)')
 
         for static in site.static:
             static.publish(publisher)
@@ -748,6 +1029,9 @@ class Liara:
                                  f'{node["dst"]}\n')
             self.__log.info(f'Wrote {len(self.__redirections)} redirections')
 
+        if manifest:
+            manifest.persist()
+
         end_time = time.time()
         self.__log.info(f'Build finished ({end_time - start_time:.2f} sec)')
         self.__cache.persist()
@@ -5,20 +5,30 @@ from typing import Dict, Iterable, List
 from enum import Enum, auto
 from collections import defaultdict
 import logging
-
-
-def _extract_links(document: DocumentNode):
-    """Extract all links from ``<a>`` and ``<img>`` tags in a document.
-
-    This assumes the document has been already processed into valid Html.
-    """
+import posixpath
+import re
+
+
+# Matches ``<a>`` and ``<img>`` start tags, skipping over quoted attribute
+# values so a ``>`` inside a value doesn't end the tag early.
+_LINK_TAG_RE = re.compile(
+    r'''<(a|img)\s((?:[^<>"']|"[^"]*"|'[^']*')*)>''', re.IGNORECASE)
+_DOUBLE_QUOTED_ATTRIBUTE_RE = re.compile(r'([^\s"\'<>/=]+)\s*=\s*"([^"]*)"')
+# Markup where tags don't mean what they seem to, or which the regular
+# expressions above can't see through
+_NEEDS_HTML_PARSER_RE = re.compile(
+    r'<!--|<!\[CDATA\[|<(?:script|style|textarea|title|xmp)\b', re.IGNORECASE)
+_LINK_ATTRIBUTE = {
+    'a': 'href',
+    'img': 'src'
+}
+
+
+def _extract_links_with_parser(content: str) -> List[str]:
     from bs4 import BeautifulSoup
-    
-    if not document.content:
-        # empty document
-        return []
-    
-    soup = BeautifulSoup(document.content, 'lxml')
+
+    soup = BeautifulSoup(content, 'lxml')
+    result = []
 
     for item in soup.find_all(['img', 'a']):
         target = None
@@ -29,7 +39,53 @@ def _extract_links(document: DocumentNode):
             target = item.attrs.get('href', None)
 
         if target and not target.startswith('#'):
-            yield target
+            result.append(target)
+
+    return result
+
+
+def _extract_links(document: DocumentNode) -> List[str]:
+    """Extract all links from ``<a>`` and ``<img>`` tags in a document.
+
+    This assumes the document has been already processed into valid Html.
+
+    .. versionchanged:: 2.7.0
+
+       Links are found by scanning the start tags instead of building a
+       document tree. Documents which can't be scanned reliably (comments,
+       scripts, unquoted or single-quoted attributes) are still parsed using
+       BeautifulSoup.
+    """
+    from html import unescape
+
+    content = document.content
+    if not content:
+        # empty document
+        return []
+
+    if _NEEDS_HTML_PARSER_RE.search(content):
+        return _extract_links_with_parser(content)
+
+    result = []
+    for match in _LINK_TAG_RE.finditer(content):
+        attributes = match.group(2)
+        # We need to see every attribute to be sure we're picking the right
+        # one, so anything which is not double-quoted requires a full parse
+        remainder = _DOUBLE_QUOTED_ATTRIBUTE_RE.sub('', attributes)
+        if '=' in remainder or '"' in remainder or "'" in remainder:
+            return _extract_links_with_parser(content)
+
+        wanted = _LINK_ATTRIBUTE[match.group(1).lower()]
+        for name, value in _DOUBLE_QUOTED_ATTRIBUTE_RE.findall(attributes):
+            if name.lower() == wanted:
+                # Like a HTML parser, the first occurrence wins
+                if '&' in value:
+                    value = unescape(value)
+                if value and not value.startswith('#'):
+                    result.append(value)
+                break
+
+    return result
 
 
 class LinkType(Enum):
@@ -71,6 +127,20 @@ def gather_links(documents: Iterable[DocumentNode], link_type: LinkType) \
     return result
 
 
+def _normalize_internal_link(link: str) -> str:
+    """Normalize an internal link the same way
+    :py:class:`~pathlib.PurePosixPath` would, i.e. the result is equal to
+    ``str(PurePosixPath(link))``.
+    """
+    # Duplicate slashes and '.' components need the full path logic, anything
+    # else can only differ by a trailing slash
+    if '//' in link or '/.' in link:
+        return str(pathlib.PurePosixPath(link))
+    if len(link) > 1 and link[-1] == '/':
+        return link[:-1]
+    return link
+
+
 def validate_internal_links(links: Dict[str, List[pathlib.PurePosixPath]],
                             site: Site) -> int:
     """Validate internal links.
@@ -82,18 +152,22 @@ def validate_internal_links(links: Dict[str, List[pathlib.PurePosixPath]],
 
     error_count = 0
 
+    # Links are strings already, so we compare strings instead of creating a
+    # path for every link
+    urls = {str(url) for url in site.urls}
+
     for link_str, sources in links.items():
-        link = pathlib.PurePosixPath(link_str)
+        link = _normalize_internal_link(link_str)
 
         # Special case handling for index.html:
         # The redirection table contains full paths including the trailing
         # index.html, so if we find a link `/foo/bar/`, we also check
         # `/foo/bar/index.html` in case a redirection is present.
-        index_url = link / 'index.html'
-        if index_url in site.urls:
+        index_url = posixpath.join(link, 'index.html')
+        if index_url in urls:
             continue
 
-        if link not in site.urls:
+        if link not in urls:
             for source in sources:
                 log.error(f'"{link}" referenced in "{source}" does not exist')
                 error_count += 1
@@ -1,11 +1,10 @@
-import cProfile
 from . import Liara
-from .config import create_default_configuration
-from .yaml import dump_yaml
 import logging
 import os
+import pathlib
+import sys
 import click
-from .nodes import NodeKind
+from .nodes import NodeKind, _parse_node_kind
 
 
 class Environment:
@@ -102,14 +101,20 @@ def _create_liara(config):
               help='Enable or disable the configured cache')
 @click.option('--parallel/--no-parallel', default=True,
               help='Enable or disable parallel processing.')
+@click.option('--force', is_flag=True,
+              help='Publish all nodes, even if incremental builds are '
+              'enabled.')
 @pass_environment
-def build(env, profile, profile_file, cache: bool, parallel: bool):
+def build(env, profile, profile_file, cache: bool, parallel: bool,
+          force: bool):
     """Build a site."""
     if profile:
+        import cProfile
         pr = cProfile.Profile()
         pr.enable()
     env.liara.build(disable_cache=not cache,
-                    parallel_build=parallel)
+                    parallel_build=parallel,
+                    force_rebuild=force)
     if profile:
         pr.disable()
         pr.dump_stats(profile_file)
@@ -119,8 +124,10 @@ def build(env, profile, profile_file, cache: bool, parallel: bool):
 @click.option('--type', '-t', 'link_type',
               type=click.Choice(['internal', 'external']),
               default='internal')
+@click.option('--cache/--no-cache', default=True,
+              help='Enable or disable the configured cache')
 @pass_environment
-def validate_links(env, link_type):
+def validate_links(env, link_type, cache: bool):
     """Validate links.
 
     Checks all internal/external links for validity. For internal links,
@@ -136,12 +143,16 @@ def validate_links(env, link_type):
     )
     liara = env.liara
     site = liara.discover_content()
-    cache = MemoryCache()
 
     env.log.debug('Processing site ...')
 
-    for document in site.documents:
-        document.process(cache)
+    # Use the same cache as 'build', so repeated runs -- and runs after a
+    # build -- don't have to process all documents again
+    if cache:
+        liara._process_documents(liara._get_cache())
+        liara._get_cache().persist()
+    else:
+        liara._process_documents(MemoryCache())
 
     env.log.debug('done')
 
@@ -176,15 +187,14 @@ def list_tags(env):
     This uses a metadata field named 'tags' and returns the union of all tags,
     as well as the count how often each tag is used."""
     from collections import Counter
+    from itertools import chain
     liara = env.liara
     site = liara.discover_content()
-    tags = []
-    for document in site.documents:
-        tags += document.metadata.get('tags', [])
+    # Count directly instead of concatenating all tags into one list first
+    tags = Counter(chain.from_iterable(
+        document.metadata.get('tags', []) for document in site.documents))
 
-    counted_tags = sorted(Counter(tags).items(), key=lambda x: x[1],
-                          reverse=True)
-    for k, v in counted_tags:
+    for k, v in tags.most_common():
         print(k, v)
 
 
@@ -220,6 +230,8 @@ def create(env, object_type):
 @click.option('--output', '-o', type=click.File(mode='w'))
 def create_config(output):
     """Create a default configuration."""
+    from .config import create_default_configuration
+    from .yaml import dump_yaml
     dump_yaml(create_default_configuration(), output)
 
 
@@ -236,6 +248,9 @@ def quickstart(template_backend):
 class _Node:
     """Helper class for tree printing, as the liara site node tree doesn't
     contain intermediate nodes."""
+    # One of these gets created per path, so avoid a per-instance __dict__
+    __slots__ = ('__name', '__children', '__data')
+
     def __init__(self, name, data=None):
         self.__name = name
         self.__children = []
@@ -257,31 +272,36 @@ class _Node:
         return self.__data
 
 
-def _print_tree(node, get_label, prefix='', last=True):
+def _print_tree(root, get_label):
     """Pretty-print a fully populated tree (meaning: all intermediate nodes
-    are present.)"""
+    are present.)
+
+    Children are printed in the order in which they are stored, so they must
+    be sorted before calling this function."""
     empty = "    "
     last_branch = "└── "
     continue_traversal = "│   "
     branch = "├── "
-    
-    if node.name == 'Site':
-        # Special case the root node: Don't add a prefix here
-        print('Site')
-        if node.children:
-            for i, c in enumerate(sorted(node.children, key=lambda n: n.name)):
-                _print_tree(c, get_label, '', i == (len(node.children) - 1))
-    else:
+
+    # Special case the root node: Don't add a prefix here
+    print('Site')
+
+    # We use an explicit stack here, which holds the node, the prefix so far,
+    # and whether the node is the last child of its parent. Children are
+    # pushed in reverse order, so they get popped in order
+    stack = [(c, '', i == 0) for i, c in enumerate(reversed(root.children))]
+    while stack:
+        node, prefix, last = stack.pop()
+
         # Normal node - print the prefix so far, append the right branch
         # symbol, then the label
         print(prefix + (last_branch if last else branch) + get_label(node))
-        if node.children:
-            for i, c in enumerate(sorted(node.children, key=lambda n: n.name)):
-                _print_tree(c, get_label, 
-                            # Logic here is: If we're last we're not adding
-                            # a vertical bar, just spaces
-                            prefix + (empty if last else continue_traversal),
-                            i == (len(node.children) - 1))
+
+        # Logic here is: If we're last we're not adding a vertical bar, just
+        # spaces
+        child_prefix = prefix + (empty if last else continue_traversal)
+        stack.extend((c, child_prefix, i == 0)
+                     for i, c in enumerate(reversed(node.children)))
 
 
 @cli.command()
@@ -302,50 +322,65 @@ def list_content(env, format, content_type):
     liara = env.liara
     content = liara.discover_content()
 
-    # We sort by path name, which makes it trivial to sort it later into a tree
-    # as children always come after their parent
-    nodes = sorted(content.nodes, key=lambda x: x.path)
+    # We sort by the path components, which makes it trivial to sort it later
+    # into a tree as children always come after their parent, and siblings
+    # are visited in name order. Comparing paths directly isn't enough, as
+    # newer Python versions compare them as strings, where '/a-b' sorts
+    # before '/a/b'
+    nodes = sorted(content.nodes, key=lambda x: x.path.parts)
     if not nodes:
         return
 
-    def filter_nodes(node):
-        if node.kind.name.lower() not in content_type:
-            return False
-        return True
-
     if content_type:
-        nodes = list(filter(filter_nodes, nodes))
+        # Compare the node kinds directly instead of converting the kind of
+        # each node back into a string
+        allowed_kinds = frozenset(map(_parse_node_kind, content_type))
+        nodes = [node for node in nodes if node.kind in allowed_kinds]
+
+    def get_resource_label(node):
+        return f"{node.path.parts[-1]}(Resource, generated from '{node.src}')"
+
+    def get_default_label(node):
+        return f"{node.path.parts[-1]}({node.kind.name})"
+
+    # Dispatch on the node kind instead of branching for every node
+    label_functions = {
+        NodeKind.Resource: get_resource_label
+    }
 
     def get_node_label(node):
-        label = f"{node.path.parts[-1]}"
-        if node.kind == NodeKind.Resource:
-            label += f"(Resource, generated from '{node.src}')"
-        else:
-            label +=  f"({node.kind.name})"
-        
-        return label
+        return label_functions.get(node.kind, get_default_label)(node)
 
     if format == 'tree':
         root = _Node('Site')
-        node_map = {'/': root}
+        node_map = {pathlib.PurePosixPath('/'): root}
 
         def add_or_create(path, data=None):
-            if str(path) in node_map:
+            if path in node_map:
                 return
 
-            # Create parent nodes recursively, as needed
-            add_or_create(path.parent)
-            
+            # Create parent nodes as needed. path.parents goes from the
+            # closest ancestor up to the root, so we walk it in reverse to
+            # create them top-down without recursing
+            parent = root
+            for ancestor in reversed(path.parents):
+                n = node_map.get(ancestor)
+                if n is None:
+                    n = _Node(ancestor.name)
+                    parent.add_child(n)
+                    node_map[ancestor] = n
+                parent = n
+
             n = _Node(path.name, data)
-            node_map[str(path.parent)].add_child(n)
-            node_map[str(path)] = n
-        
+            parent.add_child(n)
+            node_map[path] = n
+
         for node in nodes:
-            path = node.path
+            add_or_create(node.path, node)
 
-            add_or_create(path, node)
+        # Children are already sorted by name, as we insert the nodes in path
+        # component order
 
-        import sys
         # This seems to be required to get UTF-8 output redirection to work
         # in powershell. Unclear why
         sys.stdout.reconfigure(encoding='utf-8')
@@ -357,24 +392,41 @@ def list_content(env, format, content_type):
 
         _print_tree(root, get_label)
     elif format == 'list':
-        for node in nodes:
-            print(str(node.path), get_node_label(node))
+        # Write everything at once instead of printing line-by-line, which is
+        # a lot slower for large sites
+        sys.stdout.write(''.join(f'{node.path} {get_node_label(node)}\n'
+                                 for node in nodes))
     elif format == 'json':
-        import json
-        result = {
-            'version' : 1,
-            'nodes' : []
-        }
-        for node in nodes:
+        def get_node_data(node):
             data = {
                 'path': str(node.path),
                 'kind': node.kind.name
             }
             if node.src:
                 data['source'] = str(node.src)
+            return data
 
-            result['nodes'].append(data)
-        print(json.dumps(result, indent=4))
+        result = {
+            'version' : 1,
+            'nodes' : [get_node_data(node) for node in nodes]
+        }
+
+        # orjson is a lot faster for large sites, but only supports an
+        # indentation of two spaces and always writes UTF-8. The fallback
+        # produces the same bytes, so the output doesn't depend on whether
+        # orjson is installed
+        try:
+            import orjson
+        except ImportError:
+            import json
+            output = json.dumps(result, indent=2, ensure_ascii=False) + '\n'
+            sys.stdout.flush()
+            sys.stdout.buffer.write(output.encode('utf-8'))
+        else:
+            sys.stdout.flush()
+            sys.stdout.buffer.write(orjson.dumps(
+                result,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
 
 
 @cli.command()
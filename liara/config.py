@@ -16,6 +16,8 @@ def create_default_configuration() -> Dict[str, Any]:
         'plugin_directories': [],
         'build': {
             'clean_output': True,
+            'incremental': False,
+            'manifest': '.liara-build-cache/manifest.json',
             'cache.fs.directory': 'cache',
             'cache.db.directory': 'cache',
             'cache.redis.host': 'localhost',
@@ -23,7 +25,8 @@ def create_default_configuration() -> Dict[str, Any]:
             'cache.redis.db': 0,
             'cache.redis.expiration_time': 60,
             'cache.type': 'fs',
-            'resource.sass.compiler': 'libsass'
+            'resource.sass.compiler': 'libsass',
+            'resource.thumbnail.cache_key': 'content'
         },
         'ignore_files': ['*~'],
         'content': {
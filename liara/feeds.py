@@ -4,6 +4,46 @@ from . import __version__
 from .util import local_now
 import datetime
 import email.utils
+import functools
+import io
+import json
+
+# This module is only imported once a site defines feeds, so these imports
+# don't slow down sites without feeds
+from lxml.builder import ElementMaker
+from lxml import etree
+
+
+@functools.lru_cache(maxsize=4096)
+def _format_rfc2822_cached(date: datetime.datetime, utc_offset) -> str:
+    return email.utils.format_datetime(date)
+
+
+def _format_rfc2822(date: datetime.datetime) -> str:
+    """Format a date for use in a RSS feed.
+
+    Feeds get regenerated on every build, and when serving, on every request,
+    so we cache the result. Aware ``datetime`` instances compare equal if they
+    refer to the same point in time, even if they're in different time zones,
+    so the UTC offset must be part of the key."""
+    return _format_rfc2822_cached(date, date.utcoffset())
+
+
+_ATOM_NAMESPACE = 'http://www.w3.org/2005/Atom'
+_SITEMAP_NAMESPACE = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+_SITEMAP_NODE_KINDS = frozenset({NodeKind.Document, NodeKind.Index})
+
+
+def _get_cdata(text: str):
+    """Wrap ``text`` in a CDATA section if possible.
+
+    Item descriptions contain the full HTML of a document. Inside a CDATA
+    section, it can be written as-is, instead of escaping every ``<``, ``>``
+    and ``&``. CDATA sections can't contain ``]]>``, so in this case, we fall
+    back to escaping the text."""
+    if ']]>' in text:
+        return text
+    return etree.CDATA(text)
 
 
 class FeedNode(GeneratedNode):
@@ -21,47 +61,66 @@ class RSSFeedNode(FeedNode):
         self.__site = site
 
     def generate(self):
-        from lxml.builder import ElementMaker
-        from lxml import etree
-
         items = reversed(list(self.__site.get_collection(
             self.__collection).nodes)[-self.__limit:])
 
         meta = self.__site.metadata
 
-        E = ElementMaker(nsmap={
-            'atom': "http://www.w3.org/2005/Atom"
-        })
-        A = ElementMaker(namespace='http://www.w3.org/2005/Atom')
-        r = E.rss(version='2.0')
-
-        c = E.channel(
-            # See: http://www.rssboard.org/rss-profile#namespace-elements-atom
-            A.link(href=meta['base_url'] + str(self.path), rel='self',
-                   type='application/rss+xml'),
-            E.title(meta['title']),
-            E.link(meta['base_url']),
-            E.description(meta['description']),
-            E.generator(f'Liara {__version__}'),
-            E.language(meta['language']),
-            E.copyright(meta['copyright']),
-            E.lastBuildDate(email.utils.format_datetime(
-                local_now())),
-        )
-
-        for item in items:
-            assert isinstance(item, DocumentNode)
-            e = E.item(
-                E.title(item.metadata['title']),
-                E.link(meta['base_url'] + str(item.path)),
-                E.pubDate(email.utils.format_datetime(item.metadata['date'])),
-                E.guid(meta['base_url'] + str(item.path)),
-                E.description(item.content)
-            )
-            c.append(e)
-        r.append(c)
-
-        self.content = etree.tostring(r)
+        E = ElementMaker()
+
+        # We serialize each item as soon as it's created instead of building
+        # the whole tree first, as the item descriptions contain the full
+        # document content
+        buffer = io.BytesIO()
+        with etree.xmlfile(buffer, encoding='utf-8') as xf:
+            xf.write_declaration()
+            with xf.element('rss', nsmap={'atom': _ATOM_NAMESPACE},
+                            version='2.0'):
+                with xf.element('channel'):
+                    # See:
+                    # http://www.rssboard.org/rss-profile#namespace-elements-atom
+                    # This must be written through xf so it picks up the atom
+                    # prefix declared on the rss element
+                    with xf.element(f'{{{_ATOM_NAMESPACE}}}link',
+                                    href=meta['base_url'] + str(self.path),
+                                    rel='self',
+                                    type='application/rss+xml'):
+                        pass
+
+                    xf.write(
+                        E.title(meta['title']),
+                        E.link(meta['base_url']),
+                        E.description(meta['description']),
+                        E.generator(f'Liara {__version__}'),
+                        E.language(meta['language']),
+                        E.copyright(meta['copyright']),
+                        E.lastBuildDate(email.utils.format_datetime(
+                            local_now())),
+                    )
+
+                    # The ElementMaker attributes create a new factory on
+                    # each access, so we look them up once for all items
+                    base_url = meta['base_url']
+                    item_element = E.item
+                    title_element = E.title
+                    link_element = E.link
+                    date_element = E.pubDate
+                    guid_element = E.guid
+                    description_element = E.description
+
+                    for item in items:
+                        assert isinstance(item, DocumentNode)
+                        url = base_url + str(item.path)
+                        metadata = item.metadata
+                        xf.write(item_element(
+                            title_element(metadata['title']),
+                            link_element(url),
+                            date_element(_format_rfc2822(metadata['date'])),
+                            guid_element(url),
+                            description_element(_get_cdata(item.content))
+                        ))
+
+        self.content = buffer.getvalue()
 
 
 class JsonFeedNode(FeedNode):
@@ -74,7 +133,6 @@ class JsonFeedNode(FeedNode):
         self.__site = site
 
     def generate(self):
-        import json
         items = reversed(list(self.__site.get_collection(
             self.__collection).nodes)[-self.__limit:])
 
@@ -88,14 +146,17 @@ class JsonFeedNode(FeedNode):
             'description': meta['description']
         }
 
+        base_url = meta['base_url']
         result_items = []
         for item in items:
             assert isinstance(item, DocumentNode)
+            url = base_url + str(item.path)
+            metadata = item.metadata
             result_items.append({
-                'id': meta['base_url'] + str(item.path),
-                'title': item.metadata['title'],
-                'date_published': item.metadata['date'].isoformat('T'),
-                'url': meta['base_url'] + str(item.path),
+                'id': url,
+                'title': metadata['title'],
+                'date_published': metadata['date'].isoformat('T'),
+                'url': url,
                 'content_html': item.content
             })
 
@@ -110,33 +171,43 @@ class SitemapXmlFeedNode(FeedNode):
         self.__site = site
 
     def generate(self):
-        from lxml.builder import ElementMaker
-        from lxml import etree
-
-        E = ElementMaker(
-            namespace='http://www.sitemaps.org/schemas/sitemap/0.9',
-            nsmap={
-                None: 'http://www.sitemaps.org/schemas/sitemap/0.9'
-            })
-
-        metadata = self.__site.metadata
-        now = datetime.datetime.now()
-
-        urlset = E.urlset()
-        for node in self.__site.nodes:
-            if node.kind not in {NodeKind.Document, NodeKind.Index}:
-                continue
-
-            url = E.url()
-            url.append(E.loc(metadata['base_url'] + str(node.path)))
-
-            if 'date' in node.metadata:
-                url.append(E.lastmod(node.metadata['date'].isoformat()))
-            else:
-                url.append(E.lastmod(now.isoformat()))
-
-            if node.kind == NodeKind.Index:
-                # This is machine generated, so reduce priority
-                url.append(E.priority('0'))
-            urlset.append(url)
-        self.content = etree.tostring(urlset)
+        namespace = f'{{{_SITEMAP_NAMESPACE}}}'
+        url_tag = namespace + 'url'
+        loc_tag = namespace + 'loc'
+        lastmod_tag = namespace + 'lastmod'
+        priority_tag = namespace + 'priority'
+
+        def write_element(xf, tag, text):
+            with xf.element(tag):
+                xf.write(text)
+
+        base_url = self.__site.metadata['base_url']
+        # All nodes without a date use the same timestamp, so we only format
+        # it once
+        now = datetime.datetime.now().isoformat()
+
+        # Sitemaps contain every document and index, so we serialize each
+        # entry directly instead of building a tree for the whole site first
+        buffer = io.BytesIO()
+        with etree.xmlfile(buffer, encoding='utf-8') as xf:
+            xf.write_declaration()
+            with xf.element(namespace + 'urlset',
+                            nsmap={None: _SITEMAP_NAMESPACE}):
+                for node in self.__site.nodes:
+                    if node.kind not in _SITEMAP_NODE_KINDS:
+                        continue
+
+                    with xf.element(url_tag):
+                        write_element(xf, loc_tag, base_url + str(node.path))
+
+                        if 'date' in node.metadata:
+                            write_element(xf, lastmod_tag,
+                                          node.metadata['date'].isoformat())
+                        else:
+                            write_element(xf, lastmod_tag, now)
+
+                        if node.kind == NodeKind.Index:
+                            # This is machine generated, so reduce priority
+                            write_element(xf, priority_tag, '0')
+
+        self.content = buffer.getvalue()
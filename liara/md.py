@@ -7,6 +7,16 @@ from typing import (
     Any, Dict, Optional, Sequence
 )
 
+_HEADING_DEMOTIONS = {
+    'h1': 'h2',
+    'h2': 'h3',
+    'h3': 'h4',
+    'h4': 'h5',
+    'h5': 'h6',
+    'h6': 'h6',
+}
+
+
 class HeadingLevelFixupProcessor(Treeprocessor):
     """This processor demotes headings by one level.
 
@@ -15,24 +25,14 @@ class HeadingLevelFixupProcessor(Treeprocessor):
     with the next-lower heading, and adds a ``demoted`` class.
     """
     def run(self, root):
-        return self._demote_header(root)
-
-    def _demote_header(self, element):
-        _demotions = {
-            'h1': 'h2',
-            'h2': 'h3',
-            'h3': 'h4',
-            'h4': 'h5',
-            'h5': 'h6',
-            'h6': 'h6',
-        }
-
-        if demotion := _demotions.get(element.tag):
-            element.tag = demotion
-            element.set('class', 'demoted')
-
-        for e in element:
-            self._demote_header(e)
+        # Each element is visited exactly once, so a heading can't get
+        # demoted twice
+        for element in root.iter():
+            # Most elements aren't headings. A membership test is cheaper
+            # than calling get() for those
+            if (tag := element.tag) in _HEADING_DEMOTIONS:
+                element.tag = _HEADING_DEMOTIONS[tag]
+                element.set('class', 'demoted')
 
 
 class ShortcodeException(Exception):
@@ -59,12 +59,31 @@ class ShortcodeException(Exception):
 
 class _ParseBuffer:
     def __init__(self, first_line: int, lines: Sequence[str]):
-        self.__current_line = first_line
         self.__lines = lines
+        self.reset(first_line)
+
+    def reset(self, first_line: int):
+        """Move the buffer to the start of ``first_line``, so the buffer can
+        be reused for the next shortcode."""
+        self.__current_line = first_line
         self.__line_start = 0
+        self.__load_current_line()
+
+    def __load_current_line(self):
+        # peek() gets called a lot, so we keep the current line and its length
+        # around instead of indexing into the lines on every call
+        self.__line = self.__lines[self.__current_line]
+        self.__line_length = len(self.__line)
 
     def get_current_line(self) -> str:
-        return self.__lines[self.__current_line][self.__line_start:]
+        return self.__line[self.__line_start:]
+
+    def get_current_line_and_offset(self) -> tuple[str, int]:
+        """Get the current line and the offset of the current position in it.
+
+        Unlike :py:meth:`get_current_line`, this doesn't copy the rest of the
+        line, which allows matching in place."""
+        return self.__line, self.__line_start
 
     def get_current_line_number(self) -> int:
         return self.__current_line + 1
@@ -78,22 +97,23 @@ class _ParseBuffer:
                 "Unexpected end of shortcode",
                 self.__current_line)
 
+        self.__load_current_line()
+
     def advance(self, offset: int):
         self.__line_start += offset
 
     def peek(self):
-        try:
-            return self.__lines[self.__current_line][self.__line_start]
-        except IndexError:
-            return None
+        if self.__line_start < self.__line_length:
+            return self.__line[self.__line_start]
+        return None
 
     def consume(self, what: str):
         """Consume ``what`` from the input, and raise an error otherwise.
 
         ``what`` must not contain a newline."""
         assert '\n' not in what
-        line = self.get_current_line()
-        if line.startswith(what):
+        # Check at the current offset instead of slicing the line first
+        if self.__line.startswith(what, self.__line_start):
             self.advance(len(what))
         else:
             raise ShortcodeException(
@@ -101,14 +121,41 @@ class _ParseBuffer:
                 self.get_current_line_number())
 
 
+# A parser gets created for every document, so we compile these only once.
+# The key and argument patterns are used with match() at the current offset,
+# so they don't need to be anchored
+_KEY_RE = re.compile(r'\w+')
+_ARG_RE = re.compile(r'[\w-]+')
+_UNESCAPED_QUOTE_RE = re.compile(r'(?<!\\)"')
+
+# Most shortcodes fit on a single line, which we can handle with a regular
+# expression instead of the parser. The patterns follow the parser: Keys and
+# function names are \w+, values are either [\w-]+ or a string which ends at
+# the first unescaped quote. The lookaheads prevent backtracking into a
+# partial name or value, which would accept input the parser rejects. Anything
+# that doesn't match (multi-line shortcodes, errors) goes through the parser
+_SHORTCODE_ARG_RE = re.compile(
+    r'(\w+)\s*=\s*(?:"((?:[^"]|(?<=\\)")*)(?<!\\)"|([\w-]+)(?![\w-]))')
+# This is the same argument pattern as above without the groups, repeated
+_SINGLE_LINE_SHORTCODE_RE = re.compile(
+    r'<%\s*(\w+)(?!\w)\s*'
+    r'((?:\w+\s*=\s*(?:"(?:[^"]|(?<=\\)")*(?<!\\)"|[\w-]+(?![\w-]))\s*)*)'
+    r'/%>')
+
+
+def _unescape_string(value: str) -> str:
+    # Most strings don't contain escaped quotes, so we use a cheap single
+    # character check before searching for the escape sequence
+    if '\\' in value:
+        return value.replace('\\"', '"')
+    return value
+
+
 class _ShortcodeParser:
     def __init__(self, buffer: _ParseBuffer):
         self.__args = dict()
         self.__function_name = None
         self.__buffer = buffer
-        self.__key_re = re.compile(r'^\w+')
-        self.__arg_re = re.compile(r'^[\w-]+')
-        self.__whitespace_re = re.compile(r'\s')
 
     def parse(self):
         """Parse a shortcode starting at the current position in the
@@ -116,7 +163,11 @@ class _ShortcodeParser:
 
         Returns a tuple containing: Any text following the short code in the
         last line, the next line to resume parsing from, the function name,
-        and the arguments."""
+        and the arguments.
+
+        A parser can be used for multiple shortcodes. Each call returns a new
+        arguments dictionary."""
+        self.__args = dict()
         self.__consume('<%')
         self.__consume_whitespace()
         self.__function_name = self.__consume_key('function name')
@@ -158,12 +209,11 @@ class _ShortcodeParser:
         # an argument is anything that doesn't end in /%>, but we also disallow
         # whitespace and newlines. We thus search for the first whitespace
         # character or ``/%>``
-        line = self.__buffer.get_current_line()
-        if match := self.__arg_re.search(line):
-            arg = line[:match.end()]
-            self.__buffer.advance(match.end())
+        line, offset = self.__buffer.get_current_line_and_offset()
+        if match := _ARG_RE.match(line, offset):
+            self.__buffer.advance(match.end() - offset)
 
-            return arg
+            return match.group()
         else:
             raise ShortcodeException(
                     'Error while parsing shortcode: Could not parameter value',
@@ -177,17 +227,15 @@ class _ShortcodeParser:
         """
         while True:
             line = self.__buffer.get_current_line()
-            if not line:
+            # Skip the whole whitespace run at once instead of one character
+            # at a time
+            stripped = line.lstrip()
+            if not stripped:
                 self.__buffer.advance_line()
                 continue
 
-            if match := self.__whitespace_re.search(line):
-                if match.start() == 0:
-                    self.__buffer.advance(match.end())
-                else:
-                    return
-            else:
-                return
+            self.__buffer.advance(len(line) - len(stripped))
+            return
 
     def __consume_string(self) -> str:
         """Consume a quoted string from the buffer.
@@ -195,27 +243,26 @@ class _ShortcodeParser:
         This will consume multiple lines if needed.
         """
         # Strings can be multi-line while inside "
-        # Our strategy is as following: Find the next ", check if it was
-        # escaped or not, and continue until we find one
+        # Our strategy is as following: Find the next unescaped " in the
+        # current line, and continue with the next line if there is none
         self.__buffer.consume('"')
         result = []
         while True:
-            line = self.__buffer.get_current_line()
-            next_quote = 0
-            while True:
-                if (quote_position := line.find('"', next_quote)) != -1:
-                    if quote_position > 0 and line[quote_position-1] != '\\':
-                        result.append(line[:quote_position])
-                        self.__buffer.advance(quote_position)
-                        self.__buffer.consume('"')
-                        return ''.join(result).replace('\\"', '"')
-                    else:
-                        next_quote = quote_position+1
-                else:
-                    # No terminating quote in this line
-                    result.append(line)
-                    self.__buffer.advance_line()
-                    break
+            # We search the original line from the current offset on, so only
+            # the string content itself gets copied. The character before the
+            # offset is either the opening quote or there is none, so it can't
+            # make the lookbehind match
+            line, offset = self.__buffer.get_current_line_and_offset()
+            if match := _UNESCAPED_QUOTE_RE.search(line, offset):
+                quote_position = match.start()
+                result.append(line[offset:quote_position])
+                self.__buffer.advance(quote_position - offset)
+                self.__buffer.consume('"')
+                return _unescape_string(''.join(result))
+
+            # No terminating quote in this line
+            result.append(line[offset:])
+            self.__buffer.advance_line()
 
     def __consume_key(self, what: str) -> str:
         """Consume a key from the buffer.
@@ -224,13 +271,11 @@ class _ShortcodeParser:
         """
         # keys cannot span lines, so we get the current line from the buffer
         # and match from the current position on
-        line = self.__buffer.get_current_line()
-        if match := self.__key_re.search(line):
-            assert match.start() == 0
-            key = line[:match.end()]
-            self.__buffer.advance(match.end())
+        line, offset = self.__buffer.get_current_line_and_offset()
+        if match := _KEY_RE.match(line, offset):
+            self.__buffer.advance(match.end() - offset)
 
-            return key
+            return match.group()
         else:
             raise ShortcodeException(
                     f'Error while parsing shortcode: Could not parse {what}',
@@ -238,6 +283,22 @@ class _ShortcodeParser:
                     )
 
 
+class _PrettyPrintedArgs:
+    """Pretty-prints shortcode arguments for logging.
+
+    The formatting happens in ``__str__``, so it only runs if the log message
+    actually gets emitted."""
+    __slots__ = ('__args',)
+
+    def __init__(self, args: Dict[str, Any]):
+        self.__args = args
+
+    def __str__(self):
+        # Skip internal arguments as they can't be pretty-printed anyways
+        return ', '.join(f'{k}={repr(v)}' for k, v in self.__args.items()
+                         if k[0] != '$')
+
+
 class ShortcodePreprocessor(Preprocessor):
     """
     A Wordpress-inspired "shortcode" preprocessor which allows calling
@@ -272,11 +333,21 @@ class ShortcodePreprocessor(Preprocessor):
         self.__page = Page(node)
         self.__data = None
 
+    def set_node(self, node):
+        """
+        Set the node which is being processed. This allows reusing the
+        preprocessor for multiple documents.
+
+        .. versionadded:: 2.7.0
+        """
+        from .template import Page
+        self.__page = Page(node)
+
     def set_data(self, data: Dict[str, Any]):
         """
         Set the data context.
 
-        @versionadded 2.6.2
+        .. versionadded:: 2.6.2
         """
         self.__data = data
 
@@ -293,9 +364,19 @@ class ShortcodePreprocessor(Preprocessor):
         """
         import inspect
 
-        signature = inspect.signature(function)
-        if not any([p.kind == p.VAR_KEYWORD
-                    for p in signature.parameters.values()]):
+        # For plain functions and methods, the code object tells us directly
+        # whether there's a **kwargs parameter, which is a lot cheaper than
+        # building the signature. Wrapped functions need the signature, as
+        # it follows __wrapped__ to the actual handler
+        code = getattr(function, '__code__', None)
+        if code is not None and not hasattr(function, '__wrapped__'):
+            accepts_kwargs = bool(code.co_flags & inspect.CO_VARKEYWORDS)
+        else:
+            signature = inspect.signature(function)
+            accepts_kwargs = any(p.kind == p.VAR_KEYWORD
+                                 for p in signature.parameters.values())
+
+        if not accepts_kwargs:
             raise Exception(f'Cannot register function "{name}" as a '
                             'shortcode handler as the function signature '
                             'is missing a **kwargs parameter.')
@@ -304,61 +385,92 @@ class ShortcodePreprocessor(Preprocessor):
         self.__functions[name] = function
 
     def run(self, lines: list[str]):
+        # Most documents don't use shortcodes at all. Searching the joined
+        # document is a single scan, instead of a check per line, and lets us
+        # return the lines unchanged
+        if '<%' not in '\n'.join(lines):
+            return lines
+
+        return self.__process_shortcodes(lines)
+
+    def __process_shortcodes(self, lines: list[str]):
         i = 0
         line_count = len(lines)
 
+        # The parser works directly on lines, so we can use the same buffer
+        # and parser for all shortcodes in this document
+        parse_buffer = _ParseBuffer(0, lines)
+        shortcode_parser = _ShortcodeParser(parse_buffer)
+
+        # The context is the same for all shortcodes in this document
+        context: Dict[str, Any] = {'$page': self.__page}
+        if self.__data:
+            context['$data'] = self.__data
+
         # We can't use for ... in range or for ... enumerate here, as we have
         # to skip lines based on the shortcode parser
         while i < line_count:
-            line = lines[i]
-
-            if (tag_start := line.find('<%')) != -1:
-                # Only yield if the string is non-empty. Same logic below for
-                # rest
-                if start := line[:tag_start]:
-                    yield start
+            # Most lines don't contain a shortcode, so we look for the next
+            # line that does and pass everything before it through at once
+            next_shortcode_line = i
+            while next_shortcode_line < line_count \
+                    and '<%' not in lines[next_shortcode_line]:
+                next_shortcode_line += 1
+
+            if next_shortcode_line > i:
+                yield from lines[i:next_shortcode_line]
+                i = next_shortcode_line
+                continue
 
+            # The current line contains a shortcode
+            line = lines[i]
+            tag_start = line.find('<%')
+
+            # Only yield if the string is non-empty. Same logic below for
+            # rest
+            if start := line[:tag_start]:
+                yield start
+
+            if match := _SINGLE_LINE_SHORTCODE_RE.match(line, tag_start):
+                rest = line[match.end():]
+                next_line = i + 1
+                func_name = match.group(1)
+                args = {}
+                for arg in _SHORTCODE_ARG_RE.finditer(match.group(2)):
+                    key, string_value, value = arg.groups()
+                    if string_value is None:
+                        args[key] = value
+                    else:
+                        args[key] = _unescape_string(string_value)
+            else:
                 # Remove start from the current line
                 lines[i] = line[tag_start:]
 
-                parse_buffer = _ParseBuffer(i, lines)
-                shortcode_parser = _ShortcodeParser(parse_buffer)
+                parse_buffer.reset(i)
                 rest, next_line, func_name, args = shortcode_parser.parse()
 
-                args['$page'] = self.__page
-                if self.__data:
-                    args['$data'] = self.__data
-
-                def pretty_print_args(d):
-                    for k, v in d.items():
-                        # Skip internal arguments as they can't be
-                        # pretty-printed anyways
-                        if k[0] == '$':
-                            continue
-                        yield f'{k}={repr(v)}'
-
-                # Skip the text processing if logging is disabled
-                if self.__log.isEnabledFor(logging.DEBUG):
-                    self.__log.debug('Calling shortcode handler: "%s" with '
-                                     'arguments: %s',
-                                     func_name,
-                                     ', '.join(pretty_print_args(args)))
-                yield from self.__functions[func_name](**args).splitlines()
-
-                # Another shortcode in the same line, so we need to resume
-                # parsing there and cannot simply emit the rest
+            args.update(context)
+
+            self.__log.debug('Calling shortcode handler: "%s" with '
+                             'arguments: %s',
+                             func_name,
+                             _PrettyPrintedArgs(args))
+            yield from self.__functions[func_name](**args).splitlines()
+
+            # Another shortcode in the same line, so we need to resume
+            # parsing there and cannot simply emit the rest. The shortcode
+            # may have spanned multiple lines, so we continue from the last
+            # line
+            if rest:
                 if '<%' in rest:
                     assert next_line >= 1
-                    lines[next_line-1] = rest
+                    i = next_line - 1
+                    lines[i] = rest
                     continue
 
-                if rest:
-                    yield rest
+                yield rest
 
-                i = next_line
-            else:
-                yield line
-                i += 1
+            i = next_line
 
 
 class LiaraMarkdownExtensions(Extension):
@@ -373,6 +485,15 @@ class LiaraMarkdownExtensions(Extension):
         assert self.__shortcode_preprocessor
         self.__shortcode_preprocessor.set_data(data)
 
+    def set_node(self, node):
+        """Set the node which is being converted.
+
+        .. versionadded:: 2.7.0
+        """
+        self.__node = node
+        if self.__shortcode_preprocessor:
+            self.__shortcode_preprocessor.set_node(node)
+
     def extendMarkdown(self, md):
         from .signals import register_markdown_shortcodes
 
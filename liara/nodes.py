@@ -1,6 +1,9 @@
+import datetime
 from enum import auto, Enum
 import logging
 import pathlib
+import posixpath
+import re
 from .yaml import load_yaml
 
 try:
@@ -24,8 +27,6 @@ from typing import (
     TypeVar,
     Union,
 )
-import re
-import dateparser
 from abc import abstractmethod, ABC
 
 from typing import TYPE_CHECKING
@@ -126,20 +127,25 @@ class Node(ABC):
     parent: Optional['Node']
     """The parent node, if any."""
 
-    __nodes: Dict[str, 'Node']
-    """A dictionary containing all child nodes.
+    __children: List['Node']
+    """A list containing all child nodes, in the order they were added."""
+
+    __children_by_name: Optional[Dict[str, 'Node']]
+    """A dictionary containing all child nodes, which is only created once
+    :py:meth:`get_child` is called.
 
     The key is the path to the child node relative to this node. I.e. if the
     path of this node is ``/foo``, and it has a child at ``/foo/bar``, the
     key for that child would be ``bar``."""
 
     @property
-    def children(self):
+    def children(self) -> List['Node']:
         """A list containing all direct children of this node."""
-        return self.__nodes.values()
+        return self.__children
 
     def __init__(self):
-        self.__nodes = {}
+        self.__children = []
+        self.__children_by_name = None
         self.metadata = {}
         self.parent = None
 
@@ -151,8 +157,11 @@ class Node(ABC):
         ``/foo/bar``, a node with path ``/foo/bar/baz`` can be added as a
         child, but ``/baz/`` or ``/foo/bar/boo/baz`` would be invalid."""
         assert self.path != child.path
-        name = child.path.relative_to(self.path).parts[0]
-        self.__nodes[name] = child
+        self.__children.append(child)
+        if self.__children_by_name is not None:
+            # The child has exactly one more component, so its name is the
+            # key. This is a lot cheaper than computing the relative path
+            self.__children_by_name[child.path.name] = child
         child.parent = self
 
     def __repr__(self):
@@ -168,7 +177,13 @@ class Node(ABC):
         """Get a child of this node.
 
         :return: The child node or ``None`` if no such child exists."""
-        return self.__nodes.get(name)
+        # Most nodes are never looked up by name, so we only build the
+        # dictionary when needed
+        if self.__children_by_name is None:
+            self.__children_by_name = {
+                child.path.name: child for child in self.__children
+            }
+        return self.__children_by_name.get(name)
 
     def get_children(self, *, recursive=False) -> Iterable['Node']:
         """Get all children of this node.
@@ -179,11 +194,26 @@ class Node(ABC):
         * It returns a list of :py:class:`Node` instances and does not wrap it
           in a :py:class:`~liara.query.Query`
         * It can enumerate all children recursively.
+
+        Children are returned depth-first, i.e. every child is followed by its
+        own children.
         """
-        for child in self.children:
+        if not recursive:
+            yield from self.__children
+            return
+
+        # We walk the tree using an explicit stack of iterators instead of
+        # recursing, which would stack one generator per level for every node
+        stack = [iter(self.__children)]
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+                continue
+
             yield child
-            if recursive:
-                yield from child.get_children(recursive=True)
+            if child.__children:
+                stack.append(iter(child.__children))
 
     def process(self, cache: Cache, **kwargs) -> Optional[_AsyncTask]:
         """Some nodes -- resources, documents, etc. need to be processed. As
@@ -207,7 +237,20 @@ class Node(ABC):
         pass
 
 
-_metadata_marker = re.compile(r'(---|\+\+\+)\n')
+def _decode_text(data: bytes) -> str:
+    """Decode UTF-8 encoded text with normalized line endings.
+
+    This produces the same result as reading the file using
+    ``path.read_text('utf-8')``, so the bytes of a file can be read once and
+    used both for hashing and as text."""
+    text = data.decode('utf-8')
+    # Text mode translates all line endings to \n, so we have to do the same
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+_LEADING_SPACE = frozenset('\ufeff \t\r\n')
 
 
 class MetadataKind(Enum):
@@ -230,50 +273,81 @@ def extract_metadata_content(text: str):
 
     This function splits the provided text into metadata and actual content.
     """
-    meta_start, meta_end = 0, 0
-    content_start, content_end = 0, 0
-    metadata_kind = MetadataKind.Unknown
-
-    # If the document doesn't end with a trailing new-line, the metadata regex
-    # will get confused. We'll thus add a new-line to make sure this works
-    if text and text[-1] != '\n':
-        text += '\n'
-
-    for match in _metadata_marker.finditer(text):
-        if meta_start == 0:
-            if match.group() == '---\n':
-                metadata_kind = MetadataKind.Yaml
-            elif match.group() == '+++\n':
-                metadata_kind = MetadataKind.Toml
-            meta_start = match.span()[1]
-        elif meta_end == 0:
-            if match.group() == '---\n':
-                if metadata_kind != MetadataKind.Yaml:
-                    raise Exception('Metadata markers mismatch -- started '
-                                    'with "---", but ended with "+++"')
-            elif match.group() == '+++\n':
-                if metadata_kind != MetadataKind.Toml:
-                    raise Exception('Metadata markers mismatch -- started '
-                                    'with "+++", but ended with "---"')
-
-            meta_end = match.span()[0]
-            content_start = match.span()[1]
-            content_end = len(text)
-            break
+    # The metadata may be preceded by empty lines or a byte order mark, which
+    # we skip. This is usually only a character or two, so we don't scan the
+    # text using a regular expression here
+    meta_start = 0
+    text_length = len(text)
+    while meta_start < text_length and text[meta_start] in _LEADING_SPACE:
+        meta_start += 1
+
+    # The metadata has to start at the beginning of the document, so we only
+    # need to check for the start marker there, instead of scanning the whole
+    # text
+    if text.startswith('---\n', meta_start):
+        metadata_kind = MetadataKind.Yaml
+        end_marker, other_end_marker = '\n---', '\n+++'
+    elif text.startswith('+++\n', meta_start):
+        metadata_kind = MetadataKind.Toml
+        end_marker, other_end_marker = '\n+++', '\n---'
+    else:
+        # We didn't find any metadata here, so everything must be content
+        return {}, text, 1
+
+    # Skip over the start marker, but keep the new-line so we can search for
+    # the end marker including the new-line in front of it. This also finds
+    # the end marker if the metadata is empty
+    meta_start += 3
+    end = text.find(end_marker + '\n', meta_start)
+    if end == -1 and text.endswith(end_marker) \
+            and len(text) - len(end_marker) >= meta_start:
+        # The end marker is the last line without a trailing new-line
+        end = len(text) - len(end_marker)
+
+    # Any marker of the other kind before the end marker means the markers
+    # don't match up
+    other_end = text.find(other_end_marker + '\n', meta_start,
+                          end + 1 if end != -1 else len(text))
+    if other_end != -1 or (end == -1 and text.endswith(other_end_marker)):
+        start_marker, end_marker = end_marker[1:], other_end_marker[1:]
+        raise Exception('Metadata markers mismatch -- started '
+                        f'with "{start_marker}", but ended with '
+                        f'"{end_marker}"')
+
+    if end == -1:
+        raise Exception('Metadata end marker not found -- started '
+                        f'with "{end_marker[1:]}", but the marker is '
+                        'never closed')
+
+    # Skip over the new-line which is part of the end marker
+    meta_start += 1
+    meta_end = end + 1
+    content_start = end + len(end_marker) + 1
 
     if metadata_kind == MetadataKind.Yaml:
         metadata = load_yaml(text[meta_start:meta_end])
-    elif metadata_kind == MetadataKind.Toml:
-        metadata = toml.loads(text[meta_start:meta_end])
     else:
-        # We didn't find any metadata here, so everything must be content
-        return {}, text, 1
+        metadata = toml.loads(text[meta_start:meta_end])
+
+    content = text[content_start:]
+    # meta_end includes the new-line in front of the end marker, so counting
+    # up to there covers everything before the end marker. +1 for the end
+    # marker, +1 because we start counting at 1
+    return metadata, content, text.count('\n', 0, meta_end) + 2
 
-    content = text[content_start:content_end]
-    # +2 for the start/end marker, which is excluded from the
-    # meta_start/meta_end
-    # +1 because we start counting at 1
-    return metadata, content, text[meta_start:meta_end].count('\n') + 3
+
+# Matches the start of an <a> tag up to a double-quoted, relative href value.
+# The first group is everything up to the value, the second one the value.
+# This ignores case, so upper-case tags don't match the check in
+# fixup_relative_links by accident
+_RELATIVE_LINK_RE = re.compile(r'(<a\s(?:[^>]*?\s)?href=")(\.[^"]*)(?=")',
+                               re.IGNORECASE)
+# A full document may start with comments and processing instructions (for
+# instance, an XML prolog) before the doctype or the html element. The first
+# group captures this prolog
+_HTML_DOCUMENT_START_RE = re.compile(
+    r'([\ufeff\s]*(?:(?:<!--.*?-->|<\?.*?\?>)\s*)*)<(?:!doctype|html[\s>])',
+    re.IGNORECASE | re.DOTALL)
 
 
 def fixup_relative_links(document: 'DocumentNode'):
@@ -287,26 +361,71 @@ def fixup_relative_links(document: 'DocumentNode'):
     if "href=\"." not in document.content:
         return
 
-    from bs4 import BeautifulSoup
-    soup = BeautifulSoup(document.content, 'lxml')
+    # Joining strings and normalizing them is a lot cheaper than going
+    # through PurePosixPath for every link. The root path already ends with
+    # a slash, and we must not add another one as normpath keeps a leading
+    # double slash
+    parent = str(document.path.parent)
+    if not parent.endswith('/'):
+        parent += '/'
+
+    content = document.content
+
+    # Most links are plain <a href="..."> tags, which we can rewrite in place
+    # without parsing the document. This is only safe if every relative link
+    # in the content is matched by the regular expression, otherwise some of
+    # them are somewhere else (in text, in other attributes, single-quoted,
+    # etc.) and we let the HTML parser sort things out
+    if "href='." not in content:
+        links = _RELATIVE_LINK_RE.findall(content)
+        if len(links) == content.count('href=".'):
+            document.content = _RELATIVE_LINK_RE.sub(
+                lambda m: m.group(1) + posixpath.normpath(parent + m.group(2)),
+                content)
+            return
 
-    def is_relative_url(s):
-        return s and s[0] == '.'
+    from lxml import html
+
+    # Full documents have to be parsed as such, or we'd lose the doctype and
+    # everything outside of the body. Anything in front of the doctype is
+    # kept as-is, as the parser would move comments and mangle an XML prolog
+    prolog = ''
+    document_start = _HTML_DOCUMENT_START_RE.match(content)
+    is_document = document_start is not None
+    if is_document:
+        prolog = content[:document_start.end(1)]
+        root = html.document_fromstring(content[document_start.end(1):])
+    else:
+        # The content is a fragment, so we parse it into a wrapper element
+        # which we strip again after serializing
+        root = html.fragment_fromstring(content, create_parent='div')
 
-    for link in soup.find_all('a', {'href': is_relative_url}):
-        target = link.attrs.get('href')
-        link.attrs['href'] = \
-            str(document.path.parent / pathlib.PurePosixPath(target))
+    for link in root.xpath('.//a[starts-with(@href, ".")]'):
+        link.set('href', posixpath.normpath(parent + link.get('href')))
 
-    document.content = str(soup)
+    if is_document:
+        doctype = root.getroottree().docinfo.doctype
+        document.content = prolog + html.tostring(root, encoding='unicode',
+                                                  doctype=doctype or None)
+    else:
+        document.content = html.tostring(root, encoding='unicode')[
+            len('<div>'):-len('</div>')]
 
 
 def fixup_date(document: 'DocumentNode'):
     """If the date in the document is a string, try to parse it to produce a
     datetime object."""
-    if 'date' in document.metadata:
-        date = document.metadata['date']
-        if isinstance(date, str):
+    date = document.metadata.get('date')
+    if isinstance(date, str):
+        # Most dates are written in ISO format, which we can parse a lot
+        # faster than dateparser. We only go through dateparser for anything
+        # else
+        try:
+            document.metadata['date'] = datetime.datetime.fromisoformat(date)
+        except ValueError:
+            # dateparser takes a long time to import, so we only import it
+            # once we actually need it
+            import dateparser
             document.metadata['date'] = dateparser.parse(date)
 
 
@@ -320,10 +439,9 @@ class FixupDateTimezone:
     def __call__(self, document: 'DocumentNode'):
         '''If the date in the document has no timezone info, set it to the
         local timezone.'''
-        if 'date' in document.metadata:
-            date = document.metadata['date']
-            if date.tzinfo is None:
-                document.metadata['date'] = date.replace(tzinfo=self.__tz)
+        date = document.metadata.get('date')
+        if date is not None and date.tzinfo is None:
+            document.metadata['date'] = date.replace(tzinfo=self.__tz)
 
 
 class DocumentNode(Node):
@@ -350,6 +468,10 @@ class DocumentNode(Node):
         self._load_fixups = []
         self._process_fixups = []
         self._content_line_start = None
+        self._source_hash: bytes | None = None
+        # The raw content is released once the document has been processed,
+        # see _release_raw_content
+        self._raw_content: str | None = None
 
     def set_fixups(self, *, load_fixups, process_fixups) -> None:
         """Set the fixups that should be applied to this document node.
@@ -386,13 +508,33 @@ class DocumentNode(Node):
     def _load(self):
         assert self.src
 
+        source = self.src.read_bytes()
+        self._source_hash = self._get_source_hash(source)
+
         if self.metadata_path:
-            self.metadata = load_yaml(self.metadata_path.read_text())
-            self._raw_content = self.src.read_text('utf-8')
+            # The Yaml loader handles the encoding and line endings itself
+            self.metadata = load_yaml(self.metadata_path.read_bytes())
+            self._raw_content = _decode_text(source)
             self._content_line_start = 1
         else:
             self.metadata, self._raw_content, self._content_line_start = \
-                extract_metadata_content(self.src.read_text('utf-8'))
+                extract_metadata_content(_decode_text(source))
+
+    def _get_source_hash(self, source: bytes) -> bytes | None:
+        """Get the hash of the source file contents, if the node needs one.
+
+        This gets called while loading, as the raw bytes are available at that
+        point. The result is stored in ``self._source_hash``. By default, no
+        hash is computed."""
+        return None
+
+    def _release_raw_content(self):
+        """Release the raw content after processing.
+
+        Once processed, only ``content`` is needed, so we don't need to keep
+        the source text around. Processing again after this is a no-op until
+        the document gets reloaded."""
+        self._raw_content = None
 
     def reload(self):
         """Reload this node from disk.
@@ -411,58 +553,107 @@ class HtmlDocumentNode(DocumentNode):
     """A node representing a Html document."""
 
     def process(self, cache: Cache, **kwargs):
+        if self._raw_content is None:
+            # Already processed
+            return
+
         self.content = self._raw_content
 
         self._apply_process_fixups()
+        self._release_raw_content()
 
 
-class MarkdownDocumentNode(DocumentNode):
-    """A node representing a Markdown document."""
-    def __init__(self, configuration, **kwargs):
-        super().__init__(**kwargs)
-        self.__md = self._create_markdown_processor(configuration)
+class _MarkdownProcessor:
+    """A Markdown processor which can be shared by multiple
+    :py:class:`MarkdownDocumentNode` instances.
 
-    def _create_markdown_processor(self, configuration):
+    Creating the processor requires setting up all extensions, so we do this
+    only once and reset the processor after each conversion instead. The
+    processor is created on first use."""
+    def __init__(self, configuration):
+        self.__configuration = configuration
+        self.__md = None
+        self.__extension = None
+
+    def __create(self):
         from markdown import Markdown
         from .md import LiaraMarkdownExtensions
 
-        self.__mdext = LiaraMarkdownExtensions(self)
+        configuration = self.__configuration
+        self.__extension = LiaraMarkdownExtensions()
 
         extensions = [
-            self.__mdext
+            self.__extension
         ] + configuration['content.markdown.extensions']
 
         extension_configs = configuration['content.markdown.config']
         output = configuration['content.markdown.output']
 
-        return Markdown(extensions=extensions,
-                        extension_configs=extension_configs,
-                        output_format=output)
+        self.__md = Markdown(extensions=extensions,
+                             extension_configs=extension_configs,
+                             output_format=output)
+
+    def convert(self, node: 'MarkdownDocumentNode', text: str,
+                data: Optional[Dict[str, Any]]) -> str:
+        if self.__md is None:
+            self.__create()
+        assert self.__md and self.__extension
+
+        self.__extension.set_node(node)
+        self.__extension.set_data(data or {})
+
+        try:
+            return self.__md.convert(text)
+        finally:
+            self.__md.reset()
+
+
+class MarkdownDocumentNode(DocumentNode):
+    """A node representing a Markdown document."""
+    def __init__(self, configuration,
+                 markdown_processor: Optional[_MarkdownProcessor] = None,
+                 **kwargs):
+        super().__init__(**kwargs)
+        if markdown_processor is None:
+            markdown_processor = _MarkdownProcessor(configuration)
+        self.__md = markdown_processor
+
+    def _get_source_hash(self, source: bytes) -> bytes:
+        from .util import get_content_hash
+
+        # We hash the source as read from disk, which saves encoding the
+        # content again in process()
+        return get_content_hash(source)
 
     def process(self, cache: Cache, **kwargs):
-        import hashlib
         from .md import ShortcodeException
 
-        if '$data' in kwargs:
-            self.__mdext.set_data(kwargs['$data'])
+        if self._raw_content is None:
+            # Already processed
+            return
 
-        byte_content = self._raw_content.encode('utf-8')
-        content_hash = hashlib.sha256(byte_content).digest()
+        content_hash = self._source_hash
+        if content_hash is None:
+            # Subclasses may set the raw content without going through _load,
+            # in which case we have to hash it here
+            content_hash = self._get_source_hash(
+                self._raw_content.encode('utf-8'))
         if content := cache.get(content_hash):
             assert isinstance(content, str)
             self.content = content
+            self._release_raw_content()
             return
 
         # We re-raise shortcode exceptions to adjust the line number to
         # make debugging easier
         try:
-            self.content = self.__md.convert(self._raw_content)
+            self.content = self.__md.convert(self, self._raw_content,
+                                             kwargs.get('$data'))
         except ShortcodeException as sx:
             raise sx.with_line_offset(self._content_line_start) from sx
-        finally:
-            self.__md.reset()
 
         self._apply_process_fixups()
+        self._release_raw_content()
 
         cache.put(content_hash, self.content)
 
@@ -479,7 +670,7 @@ class DataNode(Node):
         self.kind = NodeKind.Data
         self.src = src
         self.path = path
-        self.content = load_yaml(self.src.open('rb'))
+        self.content = load_yaml(self.src.read_bytes())
 
 
 class IndexNode(Node):
@@ -592,6 +783,7 @@ class ResourceNode(Node):
         self.kind = NodeKind.Resource
         self.src = src
         self.path = path
+        self.metadata_path = metadata_path
         self.content = None
         if metadata_path:
             self.metadata = load_yaml(open(metadata_path, 'r'))
@@ -690,12 +882,18 @@ class SassResourceNode(ResourceNode):
         self.content = None
 
     def process(self, cache: Cache, **kwargs):
-        import hashlib
+        from .util import create_content_hasher
         if self.content is not None:
             return
 
         assert self.src
-        cache_key = hashlib.sha256(self.src.open('rb').read()).digest()
+        # We only need the file contents for the cache key, so we hash it in
+        # blocks instead of reading the whole file at once
+        hasher = create_content_hasher()
+        with self.src.open('rb') as f:
+            while block := f.read(1024 * 1024):
+                hasher.update(block)
+        cache_key = hasher.digest()
 
         if (value := cache.get(cache_key)) is not None:
             self.content = value
@@ -825,10 +1023,12 @@ class DocumentNodeFactory(NodeFactory[DocumentNode]):
 
         self.__setup_fixups(configuration)
 
+        # All Markdown documents share one processor
         self.register_type(
             ['.md'], MarkdownDocumentNode,
             extra_args={
-                'configuration': configuration
+                'configuration': configuration,
+                'markdown_processor': _MarkdownProcessor(configuration)
             })
         self.register_type(['.html'], HtmlDocumentNode)
 
@@ -866,10 +1066,13 @@ class StaticNode(Node):
         field ``image_size`` and populate it with the image resolution."""
         from PIL import Image
         if self.is_image:
-            image = Image.open(self.src)
-            self.metadata.update({
-                'image_size': image.size
-            })
+            # Opening an image only reads its header, which is all we need.
+            # The file has to be closed explicitly though, or it stays open
+            # until the image gets garbage collected
+            with Image.open(self.src) as image:
+                self.metadata.update({
+                    'image_size': image.size
+                })
 
     @property
     def is_image(self):
@@ -881,6 +1084,14 @@ class StaticNode(Node):
         return publisher.publish_static(self)
 
 
+_IMAGE_FORMAT_FROM_SUFFIX = {
+    '.jpg': 'JPEG',
+    '.jpeg': 'JPEG',
+    '.png': 'PNG',
+    '.webp': 'WEBP'
+}
+
+
 class _AsyncThumbnailTask(_AsyncTask):
     __log = logging.getLogger(f'{__name__}.{__qualname__}')
 
@@ -897,38 +1108,31 @@ class _AsyncThumbnailTask(_AsyncTask):
         from PIL import Image
         import io
         self.__log.debug('Processing "%s"', self.__src)
-        image = Image.open(self.__src)
-        width, height = image.size
-
-        scale = 1
-        if 'height' in self.__size:
-            scale = min(self.__size['height'] / height, scale)
-        if 'width' in self.__size:
-            scale = min(self.__size['width'] / width, scale)
-        width *= scale
-        height *= scale
-
-        image.thumbnail((int(width), int(height),))
-        storage = io.BytesIO()
         assert self.__src
-        result = None
-
-        format_from_suffix = {
-            '.jpg': 'JPEG',
-            '.png': 'PNG',
-            '.webp': 'WEBP'
-        }
 
         if self.__format:
             format = self.__format.upper()
         else:
-            format = format_from_suffix.get(self.__src.suffix.lower())
+            format = _IMAGE_FORMAT_FROM_SUFFIX.get(self.__src.suffix.lower())
 
         if format is None:
             raise Exception("Unsupported image type for thumbnails")
 
-        image.save(storage, format)
-        result = storage.getvalue()
+        with Image.open(self.__src) as image:
+            width, height = image.size
+
+            scale = 1
+            if 'height' in self.__size:
+                scale = min(self.__size['height'] / height, scale)
+            if 'width' in self.__size:
+                scale = min(self.__size['width'] / width, scale)
+            width *= scale
+            height *= scale
+
+            image.thumbnail((int(width), int(height),))
+            storage = io.BytesIO()
+            image.save(storage, format)
+            result = storage.getvalue()
 
         self.__log.debug('Done processing "%s"', self.__src)
         return result
@@ -937,18 +1141,58 @@ class _AsyncThumbnailTask(_AsyncTask):
         cache.put(self.__cache_key, bytes(content))
 
 
+_THUMBNAIL_CACHE_KEY = Literal['content', 'stat']
+
+
 class ThumbnailNode(ResourceNode):
+    """A thumbnail of an image.
+
+    Thumbnails are cached based on their source image. With ``cache_key`` set
+    to ``content``, the image gets hashed. With ``stat``, the path, size,
+    modification time and inode of the image are used instead. This avoids
+    reading every image on every build, but misses changes which preserve the
+    size and modification time.
+
+    .. versionchanged:: 2.7.0
+       Added ``cache_key``.
+    """
     def __init__(self, src: pathlib.Path,
                  path: pathlib.PurePosixPath, size: Dict[str, int],
-                 format: str | None = 'original'):
+                 format: str | None = 'original',
+                 *, cache_key: _THUMBNAIL_CACHE_KEY = 'content'):
         super().__init__(src, path)
         self.__size = size
         self.__format = format
+        self.__cache_key_mode = cache_key
 
-    def __get_cache_key(self) -> bytes:
-        import hashlib
+    def __get_source_key(self) -> bytes:
+        import mmap
+        import os
+        from .util import get_content_hash
         assert self.src
-        cache_key = hashlib.sha256(self.src.open('rb').read()).digest()
+
+        if self.__cache_key_mode == 'stat':
+            # We identify the source by its path and file system state, which
+            # doesn't require reading the file. This misses changes which
+            # preserve the size and modification time
+            stat = self.src.stat()
+            return b'stat:' + str(self.src.resolve()).encode('utf-8') + \
+                stat.st_size.to_bytes(8, 'little') + \
+                stat.st_mtime_ns.to_bytes(8, 'little') + \
+                stat.st_ino.to_bytes(8, 'little')
+
+        with self.src.open('rb') as f:
+            # Images can be large, so we map them instead of reading them into
+            # memory just to hash them. For small images, setting up the
+            # mapping costs more than it saves
+            if os.fstat(f.fileno()).st_size >= 1024 * 1024:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    return get_content_hash(m)
+            else:
+                return get_content_hash(f.read())
+
+    def __get_cache_key(self) -> bytes:
+        cache_key = self.__get_source_key()
 
         if 'height' in self.__size:
             cache_key += self.__size['height'].to_bytes(4, 'little')
@@ -980,6 +1224,20 @@ class ThumbnailNode(ResourceNode):
         return async_task
 
 
+_NODE_KIND_FROM_NAME = {
+    'document': NodeKind.Document,
+    'index': NodeKind.Index,
+    'static': NodeKind.Static,
+    'generated': NodeKind.Generated,
+    'resource': NodeKind.Resource,
+    'data': NodeKind.Data,
+
+    # Additional shortcuts
+    'doc': NodeKind.Document,
+    'idx': NodeKind.Index,
+}
+
+
 def _parse_node_kind(kind) -> NodeKind:
     """Parse a node kind from a string.
 
@@ -987,20 +1245,7 @@ def _parse_node_kind(kind) -> NodeKind:
     name.
 
     .. versionadded:: 2.4"""
-    kind_map = {
-            'document': NodeKind.Document,
-            'index': NodeKind.Index,
-            'static': NodeKind.Static,
-            'generated': NodeKind.Generated,
-            'resource': NodeKind.Resource,
-            'data': NodeKind.Data,
-
-            # Additional shortcuts
-            'doc': NodeKind.Document,
-            'idx': NodeKind.Index,
-    }
-
-    return kind_map[kind]
+    return _NODE_KIND_FROM_NAME[kind]
 
 
 def _process_node_sync(node: Union[ResourceNode, DocumentNode], cache: Cache, **kwargs):
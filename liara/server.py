@@ -9,6 +9,7 @@ from .nodes import (
     _process_node_sync
 )
 import pathlib
+from typing import Optional
 from .site import Site
 from .template import TemplateRepository
 from .publish import TemplatePublisher
@@ -41,16 +42,24 @@ class HttpServer:
     def __init__(self, *, open_browser=True, port=8080):
         self.__open_browser = open_browser
         self.__port = port
+        self.__template_configuration_mtime: Optional[int] = None
 
     def _reload_template_paths(self):
         """Reload the template configuration.
 
         This ensures that any change to the template configuration is
-        reflected in the template repository."""
+        reflected in the template repository. This gets called for every
+        document request, so we only parse the configuration again if the
+        file was modified since it was last loaded."""
         from .yaml import load_yaml
         template_configuration = pathlib.Path(self.__configuration['template'])
+        modification_time = template_configuration.stat().st_mtime_ns
+        if modification_time == self.__template_configuration_mtime:
+            return
+
         configuration = load_yaml(template_configuration.open())
         self.__template_repository.update_paths(configuration['paths'])
+        self.__template_configuration_mtime = modification_time
 
     def _build_single_node(self, path: pathlib.PurePosixPath):
         """Build a single node.
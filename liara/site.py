@@ -8,6 +8,8 @@ from .nodes import (
     ResourceNode,
     StaticNode,
     ThumbnailNode,
+
+    _THUMBNAIL_CACHE_KEY,
 )
 import pathlib
 from typing import (
@@ -624,13 +626,20 @@ class Site:
         # Indices may have been added, so we need to update the links
         self.create_links()
 
-    def create_thumbnails(self, thumbnail_definition):
+    def create_thumbnails(self, thumbnail_definition, *,
+                          cache_key: _THUMBNAIL_CACHE_KEY = 'content'):
         """Create thumbnails.
 
         Based on the thumbnail definition -- which is assumed to be a
         dictionary containing the suffix, the desired size and the target
         formats  -- this function iterates over all static nodes that contain
         images, and creates new thumbnail nodes as required.
+
+        :param cache_key: How thumbnails identify their source image in the
+                          cache, see :py:class:`~liara.nodes.ThumbnailNode`.
+
+        .. versionchanged:: 2.7.0
+           Added ``cache_key``.
         """
         from .util import add_suffix
 
@@ -660,7 +669,8 @@ class Site:
                 static.src,
                 new_path,
                 size,
-                format)
+                format,
+                cache_key=cache_key)
             self.add_resource(thumbnail)
 
         new_static = []
@@ -5,6 +5,7 @@ import tzlocal
 from typing import List, Optional
 import os
 import fnmatch
+import functools
 
 
 def pairwise(iterable):
@@ -147,3 +148,41 @@ def file_digest(fp) -> bytes:
     while buffer := fp.read(1024 * 1024):
         hasher.update(buffer)
     return hasher.digest()
+
+
+@functools.cache
+def _get_content_hasher_factory():
+    # We resolve this only once, as a failed import is not cached by Python
+    # and would search for the module on every call
+    try:
+        import xxhash
+        return xxhash.xxh3_128
+    except ImportError:
+        import hashlib
+        return hashlib.sha256
+
+
+def create_content_hasher():
+    """Create a hasher for content-based cache keys.
+
+    This uses ``xxhash`` if it is installed, which is a lot faster than the
+    cryptographic hashes in ``hashlib``, and falls back to SHA-256 otherwise.
+    The hasher provides ``update`` and ``digest`` like the ``hashlib``
+    hashers.
+
+    .. note::
+
+        The digest size depends on the hasher in use, so don't store the
+        digests anywhere but in the cache.
+
+    .. versionadded:: 2.7.0
+    """
+    return _get_content_hasher_factory()()
+
+
+def get_content_hash(data: bytes) -> bytes:
+    """Hash ``data`` using the hasher from :py:func:`create_content_hasher`.
+
+    .. versionadded:: 2.7.0
+    """
+    return _get_content_hasher_factory()(data).digest()
@@ -0,0 +1,47 @@
+import pathlib
+
+from liara.actions import (_extract_links, _extract_links_with_parser,
+                           validate_internal_links)
+from liara.nodes import IndexNode
+from liara.site import Site
+
+
+class _Document:
+    def __init__(self, content):
+        self.content = content
+
+
+def test_extract_links():
+    content = '''<p><a href="/a">a</a> <A HREF="/b?x=1&amp;y=2">b</A>
+        <img alt="a > b" src="/c.png"> <a href="#top">top</a>
+        <a class="no-link">none</a> <abbr title="/d">d</abbr>
+        <a href="/e" href="/f">e</a>&lt;a href="/g"&gt;</p>'''
+
+    links = _extract_links(_Document(content))
+    assert links == ['/a', '/b?x=1&y=2', '/c.png', '/e']
+    assert links == _extract_links_with_parser(content)
+
+
+def test_extract_links_falls_back_to_parser():
+    # Single-quoted and unquoted attributes as well as comments can't be
+    # scanned, so these must match the parser
+    for content in ["<a href='/a'>a</a>",
+                    '<a href=/a>a</a>',
+                    '<!-- <a href="/a"> --><a href="/b">b</a>']:
+        assert _extract_links(_Document(content)) == \
+            _extract_links_with_parser(content)
+
+
+def test_extract_links_empty_document():
+    assert _extract_links(_Document(None)) == []
+
+
+def test_validate_internal_links():
+    site = Site()
+    for path in ['/', '/a', '/b/index.html']:
+        site.add_index(IndexNode(pathlib.PurePosixPath(path)))
+
+    source = [pathlib.PurePosixPath('/source')]
+    links = {link: source for link in [
+        '/', '/a', '/a/', '/./a', '/a//', '/b', '/b/', '/c', '/a/b']}
+    assert validate_internal_links(links, site) == 2
@@ -0,0 +1,72 @@
+from liara import cmdline
+from liara.feeds import _get_cdata
+from click.testing import CliRunner
+from lxml import etree
+from lxml.builder import E
+import json
+import pathlib
+
+
+_FEEDS = """
+rss:
+  path: /rss.xml
+  collection: blog
+json:
+  path: /feed.json
+  collection: blog
+sitemap:
+  path: /sitemap.xml
+"""
+
+
+def _build_site_with_feeds(runner):
+    result = runner.invoke(cmdline.cli, ['quickstart'])
+    assert result.exit_code == 0
+
+    pathlib.Path('feeds.yaml').write_text(_FEEDS)
+
+    result = runner.invoke(cmdline.cli, ['build'])
+    assert result.exit_code == 0
+
+    return pathlib.Path('output')
+
+
+def test_feeds(tmp_path):
+    runner = CliRunner()
+    with runner.isolated_filesystem(temp_dir=tmp_path):
+        output = _build_site_with_feeds(runner)
+
+        rss_content = (output / 'rss.xml').read_bytes()
+        assert b'<description><![CDATA[<p>' in rss_content
+
+        rss = etree.fromstring(rss_content)
+        assert rss.tag == 'rss'
+        channel = rss.find('channel')
+        self_link = channel.find('{http://www.w3.org/2005/Atom}link')
+        assert self_link.get('href') == 'https://example.org/rss.xml'
+
+        items = channel.findall('item')
+        assert len(items) == 3
+        # Newest post comes first
+        assert items[0].findtext('link') == \
+            'https://example.org/blog/2019/newest-post'
+        assert items[0].findtext('pubDate').startswith('Thu, 03 Jan 2019')
+        assert '<em>Markdown</em>' in items[0].findtext('description')
+
+        feed = json.loads((output / 'feed.json').read_text())
+        assert [item['url'] for item in feed['items']] == \
+            [item.findtext('link') for item in items]
+
+        sitemap = etree.fromstring((output / 'sitemap.xml').read_bytes())
+        namespace = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+        locations = {url.findtext(f'{namespace}loc')
+                     for url in sitemap.iter(f'{namespace}url')}
+        assert 'https://example.org/' in locations
+        assert 'https://example.org/blog/2019/newest-post' in locations
+
+
+def test_cdata_fallback():
+    assert etree.tostring(E.description(_get_cdata('<p>a</p>'))) == \
+        b'<description><![CDATA[<p>a</p>]]></description>'
+    assert etree.tostring(E.description(_get_cdata('a]]>b'))) == \
+        b'<description>a]]&gt;b</description>'
@@ -1,4 +1,8 @@
-from liara.md import ShortcodePreprocessor, _ParseBuffer, _ShortcodeParser
+import functools
+import markdown
+from liara.md import (LiaraMarkdownExtensions, ShortcodePreprocessor,
+                      _ParseBuffer, _ShortcodeParser,
+                      _SINGLE_LINE_SHORTCODE_RE)
 import pytest
 
 def _get_lines(document: str) -> list[str]:
@@ -56,6 +60,57 @@ def test_shortcode_two_codes_in_one_line():
     assert output[1] == 'b'
 
 
+def test_shortcode_after_multi_line_shortcode():
+    document = """text <% code arg1="a
+b" /%> <% code arg1="c" /%> end
+last"""
+    sp = ShortcodePreprocessor()
+
+    def code(arg1, **kwargs):
+        return arg1
+
+    sp.register('code', code)
+
+    output = list(sp.run(_get_lines(document)))
+
+    assert output == ['text ', 'ab', ' ', 'c', ' end', 'last']
+
+
+def test_shortcode_single_line_matches_parser():
+    def code(**kwargs):
+        return repr({k: v for k, v in kwargs.items() if k[0] != '$'})
+
+    # Each of these is handled by the single-line path, so the output has to
+    # match what the parser produces for the same shortcode
+    for shortcode in [
+            r'<%code/%>',
+            r'<% code a=b-c  d = "e f" /%>',
+            r'<% code a="" b="x\"y" /%>',
+            r'<% code a="/%>"b=1/%>',
+            ]:
+        assert _SINGLE_LINE_SHORTCODE_RE.match(shortcode)
+
+        sp = ShortcodePreprocessor()
+        sp.register('code', code)
+        output = list(sp.run([shortcode]))
+
+        parser = _ShortcodeParser(_ParseBuffer(0, [shortcode]))
+        _, _, _, args = parser.parse()
+
+        assert output == [repr(args)]
+
+    # The parser rejects these, so the single-line path must not accept them
+    # by matching part of a name or value
+    for shortcode in [
+            r'<% codea=1 /%>',
+            r'<% code a=bc=1 /%>',
+            ]:
+        sp = ShortcodePreprocessor()
+        sp.register('code', code)
+        with pytest.raises(Exception):
+            _ = list(sp.run([shortcode]))
+
+
 def test_parse_buffer():
     lines = ['aaaa\n', 'bbb\n', '\n' 'c\n']
     pb = _ParseBuffer(0, lines)
@@ -119,6 +174,17 @@ def test_shortcode_parser_4():
     assert args['bar'] == 'baz'
 
 
+def test_shortcode_parser_empty_string():
+    lines = [r"""<% foo bar="" baz="x"/%>"""]
+    pb = _ParseBuffer(0, lines)
+    sp = _ShortcodeParser(pb)
+
+    rest, last_line, func_name, args = sp.parse()
+    assert func_name == 'foo'
+    assert args['bar'] == ''
+    assert args['baz'] == 'x'
+
+
 def test_shortcode_parser_5():
     lines = """<% figure
     arg0="foo"
@@ -150,6 +216,31 @@ def test_shortcode_register_requires_kwargs():
     sp.register('h2', h2)
 
 
+def test_shortcode_register_callables():
+    class Handler:
+        def method(self, arg1, **kwargs):
+            pass
+
+        def __call__(self, arg1, **kwargs):
+            pass
+
+    def h(arg1):
+        pass
+
+    @functools.wraps(h)
+    def wrapped(*args, **kwargs):
+        return h(*args, **kwargs)
+
+    sp = ShortcodePreprocessor()
+    sp.register('method', Handler().method)
+    sp.register('callable', Handler())
+    sp.register('partial', functools.partial(lambda a, **kwargs: None, 1))
+
+    # The wrapper accepts **kwargs, but the wrapped handler does not
+    with pytest.raises(Exception):
+        sp.register('wrapped', wrapped)
+
+
 def test_shortcode_error_handling():
     sp = ShortcodePreprocessor()
 
@@ -170,3 +261,13 @@ Body"""
     output = '\n'.join(sp.run(_get_lines(document)))
 
     assert output == document
+
+
+def test_heading_level_fixup():
+    md = markdown.Markdown(extensions=[LiaraMarkdownExtensions()])
+    html = md.convert('# One\n\n## Two\n\n> ###### Six')
+
+    assert '<h2 class="demoted">One</h2>' in html
+    assert '<h3 class="demoted">Two</h3>' in html
+    assert '<h6 class="demoted">Six</h6>' in html
+    assert '<h1' not in html
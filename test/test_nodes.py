@@ -1,6 +1,27 @@
-from liara.nodes import extract_metadata_content
+import datetime
+import os
+import pathlib
+from types import SimpleNamespace
+
+from PIL import Image
 import pytest
 
+from liara.cache import MemoryCache
+from liara.config import create_default_configuration
+from liara.nodes import (
+    extract_metadata_content,
+    fixup_date,
+    fixup_relative_links,
+    HtmlDocumentNode,
+    IndexNode,
+    MarkdownDocumentNode,
+    ThumbnailNode,
+    _decode_text,
+    _MarkdownProcessor,
+)
+from liara.signals import register_markdown_shortcodes
+from liara.util import flatten_dictionary
+
 
 def test_extract_toml_metadata():
     document = """+++
@@ -69,3 +90,246 @@ a: "b"
     assert metadata['a'] == 'b'
     assert content == ''
     assert first_content_line == 4
+
+
+def test_extract_empty_metadata():
+    document = """---
+---
+content
+"""
+
+    metadata, content, first_content_line = extract_metadata_content(document)
+    assert not metadata
+    assert content == 'content\n'
+    assert first_content_line == 3
+
+
+def test_extract_metadata_byte_order_mark():
+    document = '\ufeff+++\na = "b"\n+++\ncontent'
+
+    metadata, content, first_content_line = extract_metadata_content(document)
+    assert metadata['a'] == 'b'
+    assert content == 'content'
+    assert first_content_line == 4
+
+
+def test_extract_metadata_only_at_start():
+    # A horizontal rule in the content must not be treated as metadata
+    document = """content
+
+---
+more content
+"""
+
+    metadata, content, first_content_line = extract_metadata_content(document)
+    assert metadata == {}
+    assert content == document
+    assert first_content_line == 1
+
+
+def test_extract_metadata_end_marker_errors():
+    with pytest.raises(Exception):
+        extract_metadata_content('---\na: "b"\n+++\n---\n')
+
+    with pytest.raises(Exception):
+        extract_metadata_content('+++\na = "b"\n---')
+
+    with pytest.raises(Exception):
+        extract_metadata_content('---\na: "b"\n')
+
+
+def test_decode_text_normalizes_line_endings(tmp_path):
+    path = tmp_path / 'document.md'
+    path.write_bytes('a\r\nb\rc\nä'.encode('utf-8'))
+
+    assert _decode_text(path.read_bytes()) == path.read_text('utf-8') == \
+        'a\nb\nc\nä'
+
+
+def test_fixup_relative_links():
+    document = SimpleNamespace(
+        path=pathlib.PurePosixPath('/blog/post'),
+        content='Intro &amp; <a href="./image.png">a</a>\n'
+                '<p><a href="/absolute">b</a> <a href="./c/">c</a></p>\n')
+    fixup_relative_links(document)
+
+    assert document.content == \
+        'Intro &amp; <a href="/blog/image.png">a</a>\n' \
+        '<p><a href="/absolute">b</a> <a href="/blog/c">c</a></p>\n'
+
+    document = SimpleNamespace(
+        path=pathlib.PurePosixPath('/post'),
+        content='<a href="./a.png">a</a><a href="../b/./c.png#d">b</a>')
+    fixup_relative_links(document)
+
+    assert document.content == \
+        '<a href="/a.png">a</a><a href="/b/c.png#d">b</a>'
+
+    # Relative links which aren't in an <a> tag must be left alone, which
+    # requires parsing the document
+    document = SimpleNamespace(
+        path=pathlib.PurePosixPath('/blog/post'),
+        content='<p><code>href="./x"</code> <a title="t" href="./y">y</a> '
+                "<a href='./z'>z</a></p>")
+    fixup_relative_links(document)
+
+    assert document.content == \
+        '<p><code>href="./x"</code> <a title="t" href="/blog/y">y</a> ' \
+        '<a href="/blog/z">z</a></p>'
+
+    # Full documents which need parsing must keep everything outside of the
+    # body
+    document = SimpleNamespace(
+        path=pathlib.PurePosixPath('/x/y'),
+        content='<!DOCTYPE html><html><head><title>x</title></head><body>'
+                '<a href="./a">a</a> <a href=\'./b\'>b</a></body></html>')
+    fixup_relative_links(document)
+
+    assert document.content == \
+        '<!DOCTYPE html>\n<html><head><title>x</title></head><body>' \
+        '<a href="/x/a">a</a> <a href="/x/b">b</a></body></html>'
+
+    # Comments in front of the doctype must not turn a document into a
+    # fragment, and must be kept where they are
+    document = SimpleNamespace(
+        path=pathlib.PurePosixPath('/x/y'),
+        content='<!-- Generated -->\n<!DOCTYPE html><html><head>'
+                '<title>x</title></head><body><a href="./a">a</a> '
+                '<a href=\'./b\'>b</a></body></html>')
+    fixup_relative_links(document)
+
+    assert document.content == \
+        '<!-- Generated -->\n<!DOCTYPE html>\n<html><head><title>x</title>' \
+        '</head><body><a href="/x/a">a</a> <a href="/x/b">b</a></body></html>'
+
+
+def test_markdown_processor_shared_between_documents(tmp_path):
+    def url(**kwargs):
+        return kwargs['$page'].url
+
+    def register(sender, preprocessor):
+        preprocessor.register('url', url)
+
+    configuration = flatten_dictionary(create_default_configuration(),
+                                       ignore_keys={'content.markdown.config'})
+    processor = _MarkdownProcessor(configuration)
+
+    register_markdown_shortcodes.connect(register)
+    try:
+        documents = []
+        for name in ['a', 'b']:
+            src = tmp_path / f'{name}.md'
+            src.write_text(f'+++\ntitle = "{name}"\n+++\n<% url /%>')
+            document = MarkdownDocumentNode(
+                configuration, processor,
+                src=src, path=pathlib.PurePosixPath(f'/{name}'))
+            document.load()
+            document.process(MemoryCache())
+            documents.append(document)
+    finally:
+        register_markdown_shortcodes.disconnect(register)
+
+    assert documents[0].content == '<p>/a</p>'
+    assert documents[1].content == '<p>/b</p>'
+
+
+def test_markdown_document_without_source_hash(tmp_path):
+    configuration = flatten_dictionary(create_default_configuration(),
+                                       ignore_keys={'content.markdown.config'})
+
+    # Plugins may provide the raw content without loading a source file, so
+    # there's no source hash to use as the cache key
+    document = MarkdownDocumentNode(
+        configuration, src=tmp_path / 'a.md', path=pathlib.PurePosixPath('/a'))
+    document._raw_content = 'Some *content*'
+    document.process(MemoryCache())
+    assert document.content == '<p>Some <em>content</em></p>'
+
+
+def test_fixup_date():
+    for date, expected in [
+            ('2020-01-02 10:30:00', datetime.datetime(2020, 1, 2, 10, 30)),
+            ('2020-01-02T10:30:00+02:00',
+             datetime.datetime(2020, 1, 2, 10, 30, tzinfo=datetime.timezone(
+                 datetime.timedelta(hours=2)))),
+            # Not ISO formatted, so this has to go through dateparser
+            ('January 2, 2020', datetime.datetime(2020, 1, 2)),
+            ]:
+        document = SimpleNamespace(metadata={'date': date})
+        fixup_date(document)
+        assert document.metadata['date'] == expected
+
+
+def test_node_children():
+    root = IndexNode(pathlib.PurePosixPath('/'))
+    a = IndexNode(pathlib.PurePosixPath('/a'))
+    root.add_child(a)
+
+    assert root.get_child('a') is a
+    assert root.get_child('b') is None
+
+    # Children added after the first lookup must be found as well
+    b = IndexNode(pathlib.PurePosixPath('/b'))
+    root.add_child(b)
+    assert root.get_child('b') is b
+    assert list(root.children) == [a, b]
+    assert b.parent is root
+
+
+def test_node_get_children_recursive():
+    def create(path):
+        return IndexNode(pathlib.PurePosixPath(path))
+
+    root = create('/')
+    a, b = create('/a'), create('/b')
+    a_c, a_c_d = create('/a/c'), create('/a/c/d')
+    root.add_child(a)
+    root.add_child(b)
+    a.add_child(a_c)
+    a_c.add_child(a_c_d)
+
+    assert list(root.get_children()) == [a, b]
+    assert list(root.get_children(recursive=True)) == [a, a_c, a_c_d, b]
+    assert list(a_c_d.get_children(recursive=True)) == []
+
+
+def test_document_process_releases_raw_content(tmp_path):
+    src = tmp_path / 'page.html'
+    src.write_text('+++\ntitle = "Page"\n+++\n<p>Content</p>')
+
+    document = HtmlDocumentNode(src=src, path=pathlib.PurePosixPath('/page'))
+    document.load()
+    document.process(MemoryCache())
+    assert document.content == '<p>Content</p>'
+    assert document._raw_content is None
+
+    # Processing again must keep the content
+    document.process(MemoryCache())
+    assert document.content == '<p>Content</p>'
+
+    document.reload()
+    assert document._raw_content == '<p>Content</p>'
+
+
+def test_thumbnail_stat_cache_key(tmp_path):
+    src = tmp_path / 'image.png'
+    Image.new('RGB', (64, 32)).save(src)
+
+    def create_thumbnail():
+        return ThumbnailNode(src, pathlib.PurePosixPath('/image.thumb.png'),
+                             {'width': 16}, None, cache_key='stat')
+
+    cache = MemoryCache()
+    task = create_thumbnail().process(cache)
+    assert task is not None
+    task.update_cache(task.process(), cache)
+
+    # Same file state, so this must be a cache hit
+    thumbnail = create_thumbnail()
+    assert thumbnail.process(cache) is None
+    assert thumbnail.content
+
+    # A different modification time must invalidate the cache entry
+    stat = src.stat()
+    os.utime(src, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert create_thumbnail().process(cache) is not None
@@ -1,33 +1,221 @@
 from liara import cmdline
 import liara
+import json
+import os
+import pathlib
+import shutil
+import sys
+import pytest
 from click.testing import CliRunner
 
 
-def test_quickstart(tmp_path):
+_INCREMENTAL_BUILD_OVERRIDES = {
+    'build.clean_output': False,
+    'build.incremental': True
+}
+
+
+@pytest.fixture
+def quickstart_site(tmp_path):
+    """Create a quickstart site in a temporary directory and make it the
+    current working directory. Returns the runner used to create the site."""
     runner = CliRunner()
     with runner.isolated_filesystem(temp_dir=tmp_path):
         result = runner.invoke(cmdline.cli, ['quickstart'])
         assert result.exit_code == 0
+        yield runner
 
-        result = runner.invoke(cmdline.cli, ['build'])
-        assert result.exit_code == 0
 
+def _build_incremental(**overrides):
+    liara.Liara('config.yaml', configuration_overrides={
+        **_INCREMENTAL_BUILD_OVERRIDES,
+        **overrides
+    }).build()
+
+
+def _touch(path: pathlib.Path):
+    # The file system timestamp resolution may be too coarse to notice a
+    # change made right after the build, so we move the timestamp forward
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_quickstart(quickstart_site):
+    result = quickstart_site.invoke(cmdline.cli, ['build'])
+    assert result.exit_code == 0
+
+
+def test_inspect_data(quickstart_site):
+    # Add a data file to content
+    data = {
+        'root': 'some data'
+    }
+
+    liara.yaml.dump_yaml(data, open('content/_data.yaml', 'w'))
+
+    s = liara.Liara()
+    s.discover_content()
+
+    assert len(s.site.data) == 1
+    assert 'root' in s.site.data[0].content
+
+
+def test_incremental_build(quickstart_site):
+    _build_incremental()
+    output = pathlib.Path('output/archive/index.html')
+    output.write_text('stale')
+
+    # Nothing changed, so the output must not be touched
+    _build_incremental()
+    assert output.read_text() == 'stale'
+
+    liara.Liara('config.yaml',
+                configuration_overrides=_INCREMENTAL_BUILD_OVERRIDES).build(
+                    force_rebuild=True)
+    assert output.read_text() != 'stale'
+
+
+def test_incremental_build_source_change(quickstart_site):
+    _build_incremental()
+    post = pathlib.Path('output/blog/2019/newest-post/index.html')
+    archive = pathlib.Path('output/archive/index.html')
+    post.write_text('stale')
+    archive.write_text('stale')
+
+    source = pathlib.Path('content/blog/2019/newest-post.md')
+    source.write_text(source.read_text() + '\nAn updated paragraph.\n')
+    _touch(source)
+
+    # Only the document whose source changed must be republished
+    _build_incremental()
+    assert 'An updated paragraph.' in post.read_text()
+    assert archive.read_text() == 'stale'
+
+
+def test_incremental_build_template_change(quickstart_site):
+    _build_incremental()
+    post = pathlib.Path('output/blog/2019/newest-post/index.html')
+    post.write_text('stale')
+
+    template = pathlib.Path('templates/blog.jinja2')
+    template.write_text(
+        template.read_text().replace('</article>',
+                                     '<p>Updated template</p></article>'))
+    _touch(template)
+
+    _build_incremental()
+    assert '<p>Updated template</p>' in post.read_text()
+
+
+def test_incremental_build_template_configuration_change(quickstart_site):
+    _build_incremental()
+    blog_posts = sorted(pathlib.Path('output/blog').glob('*/*/index.html'))
+    assert blog_posts
+    previous_output = [post.read_text() for post in blog_posts]
+
+    # Changing the template mapping must republish the affected documents
+    template_configuration = pathlib.Path('templates/default.yaml')
+    template_configuration.write_text(
+        template_configuration.read_text().replace(
+            '/blog/*?kind=document: blog.jinja2',
+            '/blog/*?kind=document: page.jinja2'))
+
+    _build_incremental()
+    assert [post.read_text() for post in blog_posts] != previous_output
+
+
+def test_incremental_build_with_templates_in_site_root(quickstart_site):
+    # With the template configuration in the site root, the output, the
+    # cache and the manifest are all inside the template directory
+    for item in pathlib.Path('templates').iterdir():
+        if item.name == 'resources':
+            # The site resources use that name already
+            shutil.move(item, 'template_resources')
+        else:
+            shutil.move(item, item.name)
+    template_configuration = pathlib.Path('default.yaml')
+    template_configuration.write_text(
+        template_configuration.read_text().replace(
+            'resource_directory: resources',
+            'resource_directory: template_resources'))
+
+    _build_incremental(template='default.yaml')
+    output = pathlib.Path('output/archive/index.html')
+    output.write_text('stale')
+
+    _build_incremental(template='default.yaml')
+    assert output.read_text() == 'stale'
+
+
+def test_invalid_thumbnail_cache_key(quickstart_site):
+    with pytest.raises(Exception, match='stats'):
+        liara.Liara('config.yaml', configuration_overrides={
+            'build.resource.thumbnail.cache_key': 'stats'
+        })
+
+
+def test_list_content_json(quickstart_site):
+    result = quickstart_site.invoke(cmdline.cli,
+                                    ['list-content', '-f', 'json'])
+    assert result.exit_code == 0
+
+    content = json.loads(result.stdout)
+    assert content['version'] == 1
+    assert [(node['path'], node['kind']) for node in content['nodes']] == [
+        ('/', 'Document'),
+        ('/archive', 'Document'),
+        ('/archive/by-tag', 'Index'),
+        ('/archive/by-tag/featured', 'Index'),
+        ('/archive/by-tag/historic', 'Index'),
+        ('/archive/by-tag/new', 'Index'),
+        ('/archive/by-tag/old', 'Index'),
+        ('/archive/by-year', 'Index'),
+        ('/archive/by-year/2017', 'Index'),
+        ('/archive/by-year/2018', 'Index'),
+        ('/archive/by-year/2019', 'Index'),
+        ('/blog', 'Index'),
+        ('/blog/2017', 'Index'),
+        ('/blog/2017/the-beginning', 'Document'),
+        ('/blog/2018', 'Index'),
+        ('/blog/2018/old-but-not-oldest-post', 'Document'),
+        ('/blog/2019', 'Index'),
+        ('/blog/2019/newest-post', 'Document'),
+        ('/style.css', 'Resource'),
+    ]
+
+    # Only nodes with a source file have a source, and the separator
+    # depends on the platform
+    sources = {node['path']: pathlib.Path(node['source'])
+               for node in content['nodes'] if 'source' in node}
+    assert sources == {
+        '/': pathlib.Path('content/_index.md'),
+        '/archive': pathlib.Path('content/archive.md'),
+        '/blog/2017/the-beginning':
+            pathlib.Path('content/blog/2017/the-beginning.md'),
+        '/blog/2018/old-but-not-oldest-post':
+            pathlib.Path('content/blog/2018/old-but-not-oldest-post.md'),
+        '/blog/2019/newest-post':
+            pathlib.Path('content/blog/2019/newest-post.md'),
+        '/style.css': pathlib.Path('templates/resources/style.scss'),
+    }
 
-def test_inspect_data(tmp_path):
-    runner = CliRunner()
-    with runner.isolated_filesystem(temp_dir=tmp_path):
-        result = runner.invoke(cmdline.cli, ['quickstart'])
-        assert result.exit_code == 0
 
-        # Add a data file to content
-        data = {
-            'root': 'some data'
-        }
+def test_list_content_json_without_orjson(quickstart_site, monkeypatch):
+    # Non-ASCII characters must be written the same way on both paths
+    pathlib.Path('content/blog/2019/äöü.md').write_text(
+        '---\ntitle: Umlauts\ntags: [new]\n'
+        'date: 2019-05-01 00:00:00\n---\nContent',
+        encoding='utf-8')
 
-        liara.yaml.dump_yaml(data, open('content/_data.yaml', 'w'))
+    result = quickstart_site.invoke(cmdline.cli,
+                                    ['list-content', '-f', 'json'])
+    assert result.exit_code == 0
 
-        s = liara.Liara()
-        s.discover_content()
+    # A None entry in sys.modules makes the import fail
+    monkeypatch.setitem(sys.modules, 'orjson', None)
+    fallback = quickstart_site.invoke(cmdline.cli,
+                                      ['list-content', '-f', 'json'])
+    assert fallback.exit_code == 0
 
-        assert len(s.site.data) == 1
-        assert 'root' in s.site.data[0].content
+    assert fallback.stdout_bytes == result.stdout_bytes
+    assert 'äöü'.encode('utf-8') in fallback.stdout_bytes
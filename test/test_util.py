@@ -1,4 +1,5 @@
-from liara.util import add_suffix, flatten_dictionary, pairwise
+from liara.util import (add_suffix, flatten_dictionary, pairwise,
+                        create_content_hasher, get_content_hash)
 
 
 def test_flatten_dictionary():
@@ -39,3 +40,12 @@ def test_pairwise_one_element_list():
 
 def test_pairwise_empty_list():
     assert list(pairwise([])) == []
+
+
+def test_content_hash():
+    hasher = create_content_hasher()
+    hasher.update(b'abc')
+    hasher.update(b'def')
+
+    assert hasher.digest() == get_content_hash(b'abcdef')
+    assert get_content_hash(b'abcdef') != get_content_hash(b'abcdeg')